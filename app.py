@@ -1,7 +1,14 @@
 from flask import Flask, request, jsonify, render_template
 from flask_cors import CORS
-from recommendation_engine import FlipkartRecommendationEngine
+from recommendation_engine import FlipkartRecommendationEngine, DATA_DTYPES
+from precompute import RecommendationStore
+from stream_ingest import StreamIngestor, open_source, clean_event
+from cache import RecommendationCache
+from async_service import AsyncRecommendationService
+from facets import parse_filters, encode_cursor, decode_cursor
 import pandas as pd
+import os
+import threading
 
 app = Flask(__name__)
 CORS(app)
@@ -9,11 +16,79 @@ CORS(app)
 # Initialize recommendation engine
 engine = FlipkartRecommendationEngine()
 
+# Precomputed recommendations, set when RECOMMENDATION_STORE is configured
+store = None
+
+# Background clickstream ingestion, set when INTERACTION_STREAM is configured
+ingestor = None
+
+# Coalescing/micro-batching front end, set when BATCH_WINDOW_MS is configured
+service = None
+
+# Set once models (or the precomputed store) are loaded; gates /readyz
+ready = threading.Event()
+
+# Response cache in front of the engine's get_* methods
+cache = RecommendationCache(
+    max_entries=int(os.environ.get('CACHE_MAX_ENTRIES', 10000)),
+    max_bytes=int(os.environ.get('CACHE_MAX_BYTES', 64 * 1024 * 1024)),
+    ttl=float(os.environ.get('CACHE_TTL', 300))
+)
+
+# Largest page /api/products returns per request
+MAX_PAGE_SIZE = 1000
+
+# Recommendation methods that accept faceted filters
+FILTERED_METHODS = ('hybrid', 'ranked', 'popular')
+
+def cached(method, *args):
+    """Call engine.<method>(*args) through the response cache"""
+    if service is not None:
+        compute = lambda: service.call(method, *args)
+    else:
+        compute = lambda: getattr(engine, method)(*args)
+    return cache.get_or_compute((method,) + args, compute, version=engine.model_version)
+
+def models_unavailable():
+    """503 response for routes that need trained models in store mode, else None"""
+    if store is None:
+        return None
+    return jsonify({
+        'error': 'This route needs trained models; the server only has precomputed recommendations'
+    }), 503
+
+def unsupported_store_method(method):
+    """400 response for a method the precomputed store lacks, else None"""
+    if store is None or method == 'popular' or method in store.recommendations:
+        return None
+    return jsonify({
+        'error': f"Method '{method}' is not precomputed; "
+                 f"available: {list(store.recommendations) + ['popular']}"
+    }), 400
+
+def paginate(recommendations, offset, n):
+    """One page of a ranked list and the cursor of the next page, if it has items"""
+    # Callers fetch one item past the page to know whether another page exists
+    more = n > 0 and len(recommendations) > offset + n
+    return recommendations[offset:offset + n], encode_cursor(offset + n) if more else None
+
 @app.route('/')
 def home():
     """Home page"""
     return render_template('index.html')
 
+@app.route('/healthz', methods=['GET'])
+def liveness():
+    """Liveness probe: the process is up and serving requests"""
+    return jsonify({'status': 'alive'})
+
+@app.route('/readyz', methods=['GET'])
+def readiness():
+    """Readiness probe: only ready once the models are loaded"""
+    if not ready.is_set():
+        return jsonify({'status': 'loading'}), 503
+    return jsonify({'status': 'ready', 'model_version': engine.model_version})
+
 @app.route('/api/users', methods=['GET'])
 def get_users():
     """Get all users"""
@@ -22,17 +97,20 @@ def get_users():
 
 @app.route('/api/products', methods=['GET'])
 def get_products():
-    """Get all products with optional filtering"""
-    category = request.args.get('category')
+    """Get products matching faceted filters, one cursor page at a time"""
+    try:
+        filters = parse_filters(request.args)
+        start = decode_cursor(request.args.get('cursor'))
+        limit = max(1, min(int(request.args.get('limit', 100)), MAX_PAGE_SIZE))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    if category:
-        products = engine.products_df[
-            engine.products_df['category'] == category
-        ].to_dict('records')
-    else:
-        products = engine.products_df.to_dict('records')
+    products, next_start = engine.get_product_page(filters, start, limit)
     
-    return jsonify({'products': products[:100]})  # Limit to 100
+    return jsonify({
+        'products': products,
+        'next_cursor': encode_cursor(next_start) if next_start is not None else None
+    })
 
 @app.route('/api/categories', methods=['GET'])
 def get_categories():
@@ -45,21 +123,100 @@ def recommend_for_user(user_id):
     """Get personalized recommendations for a user"""
     n = int(request.args.get('n', 10))
     method = request.args.get('method', 'hybrid')
+    try:
+        filters = parse_filters(request.args)
+        offset = decode_cursor(request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    error = unsupported_store_method(method)
+    if error:
+        return error
+    if filters and method not in FILTERED_METHODS:
+        return jsonify({'error': f"Filters are supported for methods {list(FILTERED_METHODS)}"}), 400
+    if filters and store is not None and method != 'popular':
+        return jsonify({'error': 'Precomputed recommendations cannot be filtered'}), 400
     
+    # Rank through the end of the requested page, plus one to detect a next page
+    count = offset + n + 1
     try:
-        if method == 'collaborative':
-            recommendations = engine.get_collaborative_recommendations(user_id, n)
+        if store is not None and method != 'popular':
+            # No models are loaded; users missing from the store get popular
+            recommendations = store.get(user_id, method, count)
+            if recommendations is None:
+                recommendations = engine.get_popular_products(count)
+        elif method == 'collaborative':
+            recommendations = cached('get_collaborative_recommendations', user_id, count)
+        elif method in ('als', 'item'):
+            recommendations = cached('get_collaborative_recommendations', user_id, count, method)
         elif method == 'hybrid':
-            recommendations = engine.get_hybrid_recommendations(user_id, n)
+            recommendations = cached('get_hybrid_recommendations', user_id, count, filters)
+        elif method == 'ranked':
+            recommendations = cached('get_ranked_recommendations', user_id, count, filters)
         else:
-            recommendations = engine.get_popular_products(n)
+            recommendations = cached('get_popular_products', count, filters)
         
-        products = engine.get_product_details(recommendations)
+        page, next_cursor = paginate(recommendations, offset, n)
+        products = engine.get_product_details(page)
         
         return jsonify({
             'user_id': user_id,
             'method': method,
-            'recommendations': products
+            'recommendations': products,
+            'next_cursor': next_cursor
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/recommend/users', methods=['POST'])
+def recommend_for_users():
+    """Get personalized recommendations for many users in one call"""
+    payload = request.get_json(silent=True) or {}
+    user_ids = payload.get('user_ids')
+    n = int(payload.get('n', 10))
+    method = payload.get('method', 'hybrid')
+    
+    if not isinstance(user_ids, list):
+        return jsonify({'error': 'user_ids must be a list'}), 400
+    try:
+        filters = parse_filters(payload.get('filters') or {})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    error = unsupported_store_method(method)
+    if error:
+        return error
+    if filters and method not in FILTERED_METHODS:
+        return jsonify({'error': f"Filters are supported for methods {list(FILTERED_METHODS)}"}), 400
+    if filters and store is not None and method != 'popular':
+        return jsonify({'error': 'Precomputed recommendations cannot be filtered'}), 400
+    
+    try:
+        if store is not None and method != 'popular':
+            # Users missing from the store get popular, as on the single-user route
+            popular = engine.get_popular_products(n)
+            batch = [store.get(user_id, method, n) for user_id in user_ids]
+            batch = [recs if recs is not None else list(popular) for recs in batch]
+        elif method == 'collaborative':
+            batch = engine.get_collaborative_recommendations_batch(user_ids, n)
+        elif method in ('als', 'item'):
+            batch = engine.get_collaborative_recommendations_batch(user_ids, n, method)
+        elif method == 'hybrid':
+            batch = engine.get_hybrid_recommendations_batch(user_ids, n, filters)
+        elif method == 'ranked':
+            batch = engine.get_ranked_recommendations_batch(user_ids, n, filters)
+        else:
+            batch = [engine.get_popular_products(n, filters)] * len(user_ids)
+        
+        results = [
+            {
+                'user_id': user_id,
+                'recommendations': engine.get_product_details(recommendations)
+            }
+            for user_id, recommendations in zip(user_ids, batch)
+        ]
+        
+        return jsonify({
+            'method': method,
+            'results': results
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -68,19 +225,28 @@ def recommend_for_user(user_id):
 def recommend_similar_products(product_id):
     """Get similar products based on content"""
     n = int(request.args.get('n', 10))
+    error = models_unavailable()
+    if error:
+        return error
+    try:
+        filters = parse_filters(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     try:
-        recommendations = engine.get_content_based_recommendations(product_id, n)
+        recommendations = cached('get_content_based_recommendations', product_id, n, filters)
         products = engine.get_product_details(recommendations)
+        also_bought = engine.get_product_details(
+            cached('get_also_bought', product_id, n, filters)
+        )
         
         # Get original product details
-        original = engine.products_df[
-            engine.products_df['product_id'] == product_id
-        ].to_dict('records')
+        original = engine.get_product_details([product_id])
         
         return jsonify({
             'product': original[0] if original else None,
-            'similar_products': products
+            'similar_products': products,
+            'also_bought': also_bought
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -89,14 +255,21 @@ def recommend_similar_products(product_id):
 def recommend_by_category(category):
     """Get top products in a category"""
     n = int(request.args.get('n', 10))
+    try:
+        filters = parse_filters(request.args)
+        offset = decode_cursor(request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     try:
-        recommendations = engine.get_category_recommendations(category, n)
-        products = engine.get_product_details(recommendations)
+        recommendations = cached('get_category_recommendations', category, offset + n + 1, filters)
+        page, next_cursor = paginate(recommendations, offset, n)
+        products = engine.get_product_details(page)
         
         return jsonify({
             'category': category,
-            'recommendations': products
+            'recommendations': products,
+            'next_cursor': next_cursor
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -105,18 +278,22 @@ def recommend_by_category(category):
 def recommend_popular():
     """Get popular products"""
     n = int(request.args.get('n', 10))
+    try:
+        filters = parse_filters(request.args)
+        offset = decode_cursor(request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    recommendations = engine.get_popular_products(n)
-    products = engine.get_product_details(recommendations)
+    recommendations = cached('get_popular_products', offset + n + 1, filters)
+    page, next_cursor = paginate(recommendations, offset, n)
+    products = engine.get_product_details(page)
     
-    return jsonify({'recommendations': products})
+    return jsonify({'recommendations': products, 'next_cursor': next_cursor})
 
 @app.route('/api/product/<product_id>', methods=['GET'])
 def get_product(product_id):
     """Get product details"""
-    product = engine.products_df[
-        engine.products_df['product_id'] == product_id
-    ].to_dict('records')
+    product = engine.get_product_details([product_id])
     
     if product:
         return jsonify({'product': product[0]})
@@ -126,26 +303,28 @@ def get_product(product_id):
 @app.route('/api/user/<user_id>/history', methods=['GET'])
 def get_user_history(user_id):
     """Get user interaction history"""
-    history = engine.interactions_df[
-        engine.interactions_df['user_id'] == user_id
-    ].sort_values('timestamp', ascending=False).head(20)
+    history = engine.get_user_interactions(user_id, 20)
     
     # Get product details for each interaction
     product_ids = history['product_id'].tolist()
-    products = engine.get_product_details(product_ids)
+    products = {
+        p['product_id']: p for p in engine.get_product_details(product_ids)
+    }
     
     # Merge interaction data with product details
     history_with_products = []
-    for _, interaction in history.iterrows():
-        product = next(
-            (p for p in products if p['product_id'] == interaction['product_id']),
-            None
-        )
+    for product_id, interaction_type, timestamp, rating in zip(
+        history['product_id'],
+        history['interaction_type'],
+        history['timestamp'],
+        history['rating']
+    ):
+        product = products.get(product_id)
         if product:
             history_with_products.append({
-                'interaction_type': interaction['interaction_type'],
-                'timestamp': interaction['timestamp'],
-                'rating': interaction['rating'],
+                'interaction_type': interaction_type,
+                'timestamp': str(timestamp),
+                'rating': rating,
                 'product': product
             })
     
@@ -154,37 +333,126 @@ def get_user_history(user_id):
         'history': history_with_products
     })
 
+@app.route('/api/interactions', methods=['POST'])
+def ingest_interactions():
+    """Add new interactions (and optionally products) to the live models"""
+    payload = request.get_json(silent=True) or {}
+    interactions = payload.get('interactions', [])
+    products = payload.get('products')
+    
+    if not isinstance(interactions, list):
+        return jsonify({'error': 'interactions must be a list'}), 400
+    if products is not None and not isinstance(products, list):
+        return jsonify({'error': 'products must be a list'}), 400
+    error = models_unavailable()
+    if error:
+        return error
+    
+    # Same checks as the stream: required fields, known type, parseable timestamp
+    cleaned = [clean_event(interaction) for interaction in interactions]
+    rejected = [row for row, interaction in enumerate(cleaned) if interaction is None]
+    if rejected:
+        return jsonify({
+            'error': f'{len(rejected)} invalid interaction(s); nothing was ingested',
+            'rejected': rejected[:100]
+        }), 400
+    
+    fields = list(DATA_DTYPES['products'])
+    rejected = [
+        row for row, product in enumerate(products or [])
+        if not isinstance(product, dict) or any(product.get(field) in (None, '') for field in fields)
+    ]
+    if rejected:
+        return jsonify({
+            'error': f'{len(rejected)} invalid product(s), each needs {fields}; nothing was ingested',
+            'rejected': rejected[:100]
+        }), 400
+    
+    try:
+        engine.ingest(cleaned, new_products=products)
+        return jsonify({
+            'ingested': len(cleaned),
+            'model_version': engine.model_version
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/stats', methods=['GET'])
 def get_stats():
     """Get system statistics"""
+    # Ingested interactions not yet compacted are counted from the delta
+    interactions = (engine.interactions_df, engine.interaction_delta)
     stats = {
         'total_products': len(engine.products_df),
         'total_users': len(engine.users_df),
-        'total_interactions': len(engine.interactions_df),
+        'total_interactions': sum(len(df) for df in interactions),
         'categories': engine.products_df['category'].nunique(),
         'brands': engine.products_df['brand'].nunique(),
         'avg_rating': round(engine.products_df['rating'].mean(), 2),
-        'total_purchases': len(engine.interactions_df[
-            engine.interactions_df['interaction_type'] == 'purchase'
-        ])
+        'total_purchases': sum(
+            int((df['interaction_type'] == 'purchase').sum()) for df in interactions
+        )
     }
     
+    stats['cache'] = cache.stats()
+    if service is not None:
+        stats['service'] = service.stats()
+    if ingestor is not None:
+        stats['ingest'] = ingestor.metrics()
+    
     return jsonify(stats)
 
-def initialize_app():
-    """Initialize the recommendation engine"""
+def initialize_app(train_if_missing=False):
+    """Load the models (or precomputed store) once; never trains unless asked"""
+    global store
     print("Initializing Flipkart Recommendation System...")
-    try:
-        engine.load_models()
-        print("✅ Models loaded successfully")
-    except:
-        print("⚠️ Models not found. Training new models...")
-        engine.train()
-        engine.save_models()
+    
+    store_path = os.environ.get('RECOMMENDATION_STORE')
+    if store_path:
+        # Serve user recommendations from the precomputed store, no models
+        store = RecommendationStore(store_path)
+        engine.load_catalogue()
+        print(f"✅ Serving precomputed recommendations from {store_path}")
+    else:
+        try:
+            engine.load_models()
+            print("✅ Models loaded successfully")
+        except FileNotFoundError:
+            # Only the dev server trains; production fails fast instead
+            if not train_if_missing:
+                raise
+            print("⚠️ Models not found. Training new models...")
+            engine.train()
+            engine.save_models()
+    
+    ready.set()
     print("✅ System ready!")
 
+def start_ingestor():
+    """Start background ingestion when INTERACTION_STREAM is configured"""
+    global ingestor
+    stream = os.environ.get('INTERACTION_STREAM')
+    if stream and store is None:
+        # Tail a CSV file or listen on tcp://host:port for new interactions
+        ingestor = StreamIngestor(engine, open_source(stream)).start()
+        print(f"✅ Ingesting interactions from {stream}")
+
+def start_service():
+    """Start the coalescing front end when BATCH_WINDOW_MS is configured"""
+    global service
+    window_ms = os.environ.get('BATCH_WINDOW_MS')
+    if window_ms:
+        service = AsyncRecommendationService(
+            engine,
+            batch_window=float(window_ms) / 1000,
+            max_batch_size=int(os.environ.get('MAX_BATCH_SIZE', 64))
+        ).start()
+        print(f"✅ Coalescing requests in {window_ms} ms batches")
+
 if __name__ == '__main__':
-    initialize_app()
+    initialize_app(train_if_missing=True)
+    start_ingestor()
+    start_service()
     print("\n" + "="*50)
     print("🚀 Starting Flask server...")
     print("API available at: http://localhost:5000")
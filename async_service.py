@@ -0,0 +1,191 @@
+"""
+Asyncio front end for the engine's get_* methods.
+
+Identical requests already in flight share one computation. Distinct
+user/product queries that arrive within `batch_window` seconds are
+grouped into a single call to the engine's *_batch method, i.e. one
+multi-row kneighbors call for collaborative, hybrid and ranked. Scoring
+runs in an executor so the event loop keeps collecting the next batch.
+
+Synchronous callers (Flask request threads) use start() and call(),
+which run the loop in a background thread. Run this module for a
+fan-out demo:
+
+    python async_service.py
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# get_* methods with a *_batch counterpart that takes a list of ids
+BATCHED_METHODS = {
+    'get_collaborative_recommendations': 'get_collaborative_recommendations_batch',
+    'get_content_based_recommendations': 'get_content_based_recommendations_batch',
+    'get_hybrid_recommendations': 'get_hybrid_recommendations_batch',
+    'get_ranked_recommendations': 'get_ranked_recommendations_batch'
+}
+
+def _settle(done, futures, batched):
+    """Copy an executor result (or error) onto the waiting futures"""
+    # Results line up with the full futures list; skip callers already done
+    if done.exception() is not None:
+        for future in futures:
+            if not future.done():
+                future.set_exception(done.exception())
+        return
+    
+    results = done.result() if batched else [done.result()]
+    for future, result in zip(futures, results):
+        if not future.done():
+            future.set_result(result)
+
+class AsyncRecommendationService:
+    """Coalesce identical engine requests and micro-batch distinct ones"""
+    
+    def __init__(self, engine, batch_window=0.002, max_batch_size=64, executor=None):
+        self.engine = engine
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self.executor = executor or ThreadPoolExecutor(max_workers=2)
+        
+        self._inflight = {}  # (method, *args) -> future shared by callers
+        self._pending = {}   # (method, *args[1:]) -> {id: future}
+        self._timers = {}
+        self._loop = None
+        self._thread = None
+        self._stats = {
+            'requests': 0,
+            'coalesced': 0,
+            'engine_calls': 0,
+            'batches': 0,
+            'batched_queries': 0
+        }
+    
+    async def get(self, method, *args):
+        """Await engine.<method>(*args), sharing work with concurrent callers"""
+        self._stats['requests'] += 1
+        key = (method,) + args
+        future = self._inflight.get(key)
+        if future is not None:
+            self._stats['coalesced'] += 1
+            return await asyncio.shield(future)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        
+        if method in BATCHED_METHODS:
+            self._enqueue(method, args, future)
+        else:
+            self._submit([future], False, getattr(self.engine, method), *args)
+        
+        # Shielded so one caller cancelling doesn't cancel the others
+        return await asyncio.shield(future)
+    
+    def start(self):
+        """Run the event loop in a daemon thread for synchronous callers"""
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def call(self, method, *args, timeout=None):
+        """Blocking get() from another thread; requires start()"""
+        return asyncio.run_coroutine_threadsafe(
+            self.get(method, *args), self._loop
+        ).result(timeout)
+    
+    def stop(self, timeout=5.0):
+        """Stop the background loop"""
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+    
+    def stats(self):
+        """Request, coalescing and batching counters"""
+        stats = dict(self._stats)
+        stats['batch_window_ms'] = self.batch_window * 1000
+        stats['avg_batch_size'] = (
+            round(stats['batched_queries'] / stats['batches'], 2) if stats['batches'] else 0.0
+        )
+        return stats
+    
+    def _enqueue(self, method, args, future):
+        """Add one id to its batch, flushing on size or when the window closes"""
+        group = (method,) + args[1:]
+        pending = self._pending.setdefault(group, {})
+        pending[args[0]] = future
+        
+        if len(pending) >= self.max_batch_size:
+            self._flush(group)
+        elif group not in self._timers:
+            self._timers[group] = asyncio.get_running_loop().call_later(
+                self.batch_window, self._flush, group
+            )
+    
+    def _flush(self, group):
+        timer = self._timers.pop(group, None)
+        if timer is not None:
+            timer.cancel()
+        pending = self._pending.pop(group, None)
+        if not pending:
+            return
+        
+        self._stats['batches'] += 1
+        self._stats['batched_queries'] += len(pending)
+        method, extra = group[0], group[1:]
+        self._submit(
+            list(pending.values()),
+            True,
+            getattr(self.engine, BATCHED_METHODS[method]),
+            list(pending),
+            *extra
+        )
+    
+    def _submit(self, futures, batched, fn, *args):
+        """Run fn in the executor and resolve futures with its result"""
+        self._stats['engine_calls'] += 1
+        done = asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        done.add_done_callback(lambda done: _settle(done, futures, batched))
+
+if __name__ == "__main__":
+    import random
+    import time
+    
+    from recommendation_engine import FlipkartRecommendationEngine
+    
+    engine = FlipkartRecommendationEngine()
+    engine.load_models()
+    
+    # Count kneighbors calls made on the engine's behalf
+    knn_calls = [0]
+    kneighbors = engine.knn_model.kneighbors
+    def counted_kneighbors(*args, **kwargs):
+        knn_calls[0] += 1
+        return kneighbors(*args, **kwargs)
+    engine.knn_model.kneighbors = counted_kneighbors
+    
+    # Page-render fan-out: 2000 requests over 200 users, many repeated
+    rng = random.Random(0)
+    users = engine.users_df['user_id'].tolist()[:200]
+    requests = [
+        (rng.choice(['get_hybrid_recommendations', 'get_collaborative_recommendations']),
+         rng.choice(users), 10)
+        for _ in range(2000)
+    ]
+    
+    start = time.perf_counter()
+    for method, user_id, n in requests:
+        getattr(engine, method)(user_id, n)
+    sequential = time.perf_counter() - start
+    sequential_calls, knn_calls[0] = knn_calls[0], 0
+    
+    async def fan_out():
+        service = AsyncRecommendationService(engine, batch_window=0.002)
+        start = time.perf_counter()
+        await asyncio.gather(*(service.get(*request) for request in requests))
+        return time.perf_counter() - start, service.stats()
+    
+    elapsed, stats = asyncio.run(fan_out())
+    print(f"Sequential: {sequential:.2f}s, {sequential_calls} kneighbors calls")
+    print(f"Async:      {elapsed:.2f}s, {knn_calls[0]} kneighbors calls")
+    print(stats)
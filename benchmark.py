@@ -0,0 +1,318 @@
+"""
+Benchmarks for the engine's hot paths and the Flask API.
+
+For each dataset scale this generates data (once, under --workdir), then
+in fresh processes so peak RSS is per phase:
+
+- trains and saves the models (train time, per-stage timings, peak RSS)
+- loads the saved models and times every get_* method and /api route
+  (load time, peak RSS, p50/p95/p99 latency in ms)
+
+Results are written as JSON, tagged with the git commit, so runs can be
+compared across commits:
+
+    python benchmark.py --scales default 10k --output bench.json
+    python benchmark.py --scales default 10k --compare bench.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import quote, urlencode
+
+import numpy as np
+
+# name -> (products, users, interactions)
+SCALES = {
+    'default': (500, 1000, 5000),
+    '10k': (2000, 10000, 50000),
+    '100k': (10000, 100000, 500000),
+    '1m': (50000, 1000000, 5000000)
+}
+
+BATCH_SIZE = 32
+
+def _git_commit():
+    """Current commit hash, or None outside a git checkout"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _latency(fn, args_list):
+    """p50/p95/p99/mean latency in ms of fn(*args) over args_list, after one warm-up call"""
+    fn(*args_list[0])
+    timings = np.empty(len(args_list))
+    for i, args in enumerate(args_list):
+        start = time.perf_counter()
+        fn(*args)
+        timings[i] = time.perf_counter() - start
+    
+    p50, p95, p99 = np.percentile(timings * 1000, [50, 95, 99])
+    return {
+        'n': len(args_list),
+        'p50_ms': round(float(p50), 3),
+        'p95_ms': round(float(p95), 3),
+        'p99_ms': round(float(p99), 3),
+        'mean_ms': round(float(timings.mean() * 1000), 3)
+    }
+
+def generate(scale, workdir, regenerate=False, seed=0):
+    """Generate the scale's CSV data unless it already exists"""
+    from data_generator import FlipkartDataGenerator
+    
+    data_dir = os.path.join(workdir, scale, 'data')
+    if not regenerate and os.path.exists(os.path.join(data_dir, 'interactions.csv')):
+        return data_dir
+    
+    os.makedirs(data_dir, exist_ok=True)
+    n_products, n_users, n_interactions = SCALES[scale]
+    start = time.perf_counter()
+    FlipkartDataGenerator(seed).save_data(n_products, n_users, n_interactions, data_dir)
+    print(f"✅ Generated {scale} data in {time.perf_counter() - start:.1f}s")
+    return data_dir
+
+def bench_train(data_dir, model_dir, workers=None):
+    """Train and save models; run in a fresh process"""
+    from recommendation_engine import FlipkartRecommendationEngine, _peak_rss_mb
+    
+    engine = FlipkartRecommendationEngine(data_dir=data_dir)
+    start = time.perf_counter()
+    engine.train(workers=workers)
+    train_s = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    engine.save_models(model_dir)
+    save_s = time.perf_counter() - start
+    
+    return {
+        'train_s': round(train_s, 3),
+        'save_s': round(save_s, 3),
+        'stages': engine.training_report['stages'],
+        'peak_rss_mb': _peak_rss_mb()
+    }
+
+def bench_serve(data_dir, model_dir, n_queries=200, seed=0):
+    """Load models and time every get_* method and API route; run in a fresh process"""
+    from recommendation_engine import FlipkartRecommendationEngine, _peak_rss_mb
+    import app as app_module
+    
+    engine = FlipkartRecommendationEngine(data_dir=data_dir)
+    start = time.perf_counter()
+    engine.load_models(model_dir)
+    load_s = time.perf_counter() - start
+    
+    # The interactions table is read on first use; time it on its own so the
+    # first history sample doesn't carry it
+    start = time.perf_counter()
+    engine.interactions_df
+    lazy_load_s = time.perf_counter() - start
+    load_rss = _peak_rss_mb()
+    
+    rng = np.random.default_rng(seed)
+    users = rng.choice(engine.users_df['user_id'].to_numpy(dtype=str), n_queries).tolist()
+    products = rng.choice(engine.product_ids, n_queries).tolist()
+    categories = rng.choice(
+        np.asarray(engine.products_df['category'].unique(), dtype=str), n_queries
+    ).tolist()
+    user_batches = [
+        rng.choice(users, BATCH_SIZE).tolist() for _ in range(max(n_queries // 10, 1))
+    ]
+    product_batches = [
+        rng.choice(products, BATCH_SIZE).tolist() for _ in range(max(n_queries // 10, 1))
+    ]
+    
+    methods = {
+        'get_collaborative_recommendations': [(u, 10) for u in users],
+        'get_collaborative_recommendations_batch': [(b, 10) for b in user_batches],
+        'get_collaborative_recommendations (als)': [(u, 10, 'als') for u in users],
+        'get_collaborative_recommendations_batch (als)': [(b, 10, 'als') for b in user_batches],
+        'get_collaborative_recommendations (item)': [(u, 10, 'item') for u in users],
+        'get_also_bought': [(p, 10) for p in products],
+        'get_content_based_recommendations': [(p, 10) for p in products],
+        'get_content_based_recommendations_batch': [(b, 10) for b in product_batches],
+        'get_hybrid_recommendations': [(u, 10) for u in users],
+        'get_hybrid_recommendations_batch': [(b, 10) for b in user_batches],
+        'get_ranked_recommendations': [(u, 10) for u in users],
+        'get_ranked_recommendations_batch': [(b, 10) for b in user_batches],
+        'get_popular_products': [(10,)] * n_queries,
+        'get_category_recommendations': [(c, 10) for c in categories],
+        'get_user_interactions': [(u, 20) for u in users],
+        'get_product_details': [(b[:10],) for b in product_batches]
+    }
+    method_results = {
+        name: _latency(getattr(engine, name.split(' ')[0]), args)
+        for name, args in methods.items()
+    }
+    
+    # Serve the loaded engine through the app with the response cache
+    # disabled, so every request measures engine work plus serialisation
+    app_module.engine = engine
+    app_module.cache.max_entries = 0
+    app_module.ready.set()
+    client = app_module.app.test_client()
+    
+    routes = {
+        'GET /api/users': [('/api/users',)],
+        'GET /api/products': [('/api/products',)],
+        # Categories such as 'Home & Kitchen' must be URL-encoded
+        'GET /api/products?category': [
+            ('/api/products?' + urlencode({'category': c}),) for c in categories
+        ],
+        'GET /api/products?filters': [
+            ('/api/products?' + urlencode({
+                'category': c, 'min_rating': 4, 'max_price': 20000, 'in_stock': 1
+            }),)
+            for c in categories
+        ],
+        'GET /api/categories': [('/api/categories',)],
+        'GET /api/recommend/user (hybrid)': [
+            (f'/api/recommend/user/{u}?method=hybrid',) for u in users
+        ],
+        'GET /api/recommend/user (ranked)': [
+            (f'/api/recommend/user/{u}?method=ranked',) for u in users
+        ],
+        'GET /api/recommend/user (ranked, filtered)': [
+            (f'/api/recommend/user/{u}?method=ranked&min_rating=4&in_stock=1',) for u in users
+        ],
+        'GET /api/recommend/user (collaborative)': [
+            (f'/api/recommend/user/{u}?method=collaborative',) for u in users
+        ],
+        'GET /api/recommend/user (als)': [
+            (f'/api/recommend/user/{u}?method=als',) for u in users
+        ],
+        'GET /api/recommend/user (item)': [
+            (f'/api/recommend/user/{u}?method=item',) for u in users
+        ],
+        'GET /api/recommend/product': [(f'/api/recommend/product/{p}',) for p in products],
+        'GET /api/recommend/category': [
+            (f'/api/recommend/category/{quote(c)}',) for c in categories
+        ],
+        'GET /api/recommend/popular': [('/api/recommend/popular',)],
+        'GET /api/product': [(f'/api/product/{p}',) for p in products],
+        'GET /api/user/history': [(f'/api/user/{u}/history',) for u in users],
+        'GET /api/stats': [('/api/stats',)],
+        'GET /readyz': [('/readyz',)]
+    }
+    route_results = {}
+    for name, args in routes.items():
+        if len(args) == 1:
+            args = args * n_queries
+        route_results[name] = _latency(client.get, args)
+    
+    route_results['POST /api/recommend/users'] = _latency(
+        lambda batch: client.post('/api/recommend/users', json={'user_ids': batch}),
+        [(b,) for b in user_batches]
+    )
+    
+    return {
+        'load_s': round(load_s, 3),
+        'lazy_load_s': round(lazy_load_s, 3),
+        'load_peak_rss_mb': load_rss,
+        'peak_rss_mb': _peak_rss_mb(),
+        'methods': method_results,
+        'routes': route_results
+    }
+
+def _in_fresh_process(fn, *args):
+    """Run fn(*args) in a new interpreter so its peak RSS is its own"""
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(1, mp_context=context) as pool:
+        return pool.submit(fn, *args).result()
+
+def run(scales, workdir='bench', n_queries=200, workers=None, regenerate=False):
+    """Benchmark each scale and return the results document"""
+    results = {
+        'commit': _git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'scales': {}
+    }
+    
+    for scale in scales:
+        n_products, n_users, n_interactions = SCALES[scale]
+        print(f"\n=== {scale}: {n_products} products, {n_users} users, "
+              f"{n_interactions} interactions ===")
+        data_dir = generate(scale, workdir, regenerate)
+        model_dir = os.path.join(workdir, scale, 'models')
+        
+        results['scales'][scale] = {
+            'products': n_products,
+            'users': n_users,
+            'interactions': n_interactions,
+            'train': _in_fresh_process(bench_train, data_dir, model_dir, workers),
+            'serve': _in_fresh_process(bench_serve, data_dir, model_dir, n_queries)
+        }
+        print_scale(scale, results['scales'][scale])
+    
+    return results
+
+def print_scale(scale, result):
+    """Print one scale's results as a table"""
+    train, serve = result['train'], result['serve']
+    print(f"\n{scale}: train {train['train_s']:.2f}s (peak {train['peak_rss_mb']} MB), "
+          f"load {serve['load_s']:.2f}s + interactions {serve['lazy_load_s']:.2f}s "
+          f"(peak {serve['load_peak_rss_mb']} MB)")
+    print(f"{'':<44} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, row in list(serve['methods'].items()) + list(serve['routes'].items()):
+        print(f"{name:<44} {row['p50_ms']:>9.3f} {row['p95_ms']:>9.3f} {row['p99_ms']:>9.3f}")
+
+def compare(baseline, current, threshold=0.2):
+    """Print timings that changed by more than threshold against a baseline run"""
+    print(f"\nCompared with {baseline.get('commit')} (changes over {threshold:.0%}):")
+    changes = 0
+    for scale, result in current['scales'].items():
+        old = baseline['scales'].get(scale)
+        if old is None:
+            continue
+        
+        pairs = [
+            ('train_s', old['train']['train_s'], result['train']['train_s']),
+            ('load_s', old['serve']['load_s'], result['serve']['load_s']),
+            ('lazy_load_s', old['serve'].get('lazy_load_s'), result['serve']['lazy_load_s'])
+        ]
+        for group in ('methods', 'routes'):
+            for name, row in result['serve'][group].items():
+                if name in old['serve'][group]:
+                    pairs.append((f'{name} p95', old['serve'][group][name]['p95_ms'], row['p95_ms']))
+        
+        for name, before, after in pairs:
+            if before and abs(after - before) / before > threshold:
+                changes += 1
+                print(f"  {scale:<8} {name:<48} {before:>9.3f} -> {after:>9.3f} "
+                      f"({(after - before) / before:+.0%})")
+    
+    if not changes:
+        print("  no significant changes")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', nargs='+', choices=list(SCALES), default=['default', '10k'])
+    parser.add_argument('--workdir', default='bench')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=None,
+                        help='training workers (default: all cores)')
+    parser.add_argument('--regenerate', action='store_true',
+                        help='regenerate datasets even if they exist')
+    parser.add_argument('--output', default=None, help='write results JSON here')
+    parser.add_argument('--compare', default=None, help='baseline results JSON')
+    args = parser.parse_args()
+    
+    results = run(args.scales, args.workdir, args.queries, args.workers, args.regenerate)
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✅ Results written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
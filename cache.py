@@ -0,0 +1,105 @@
+"""
+Response cache for recommendation lookups.
+
+Entries are keyed on (method, id, n), expire after a TTL and are evicted
+least-recently-used first once the entry or byte budget is exceeded.
+The whole cache is dropped when the engine's model_version changes
+(train, load_models or ingest).
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+def _size_of(value):
+    """Approximate bytes held by a cached list of ids"""
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple)):
+        size += sum(sys.getsizeof(item) for item in value)
+    return size
+
+class RecommendationCache:
+    """Thread-safe TTL + LRU cache bounded by entries and bytes"""
+    
+    def __init__(self, max_entries=10000, max_bytes=64 * 1024 * 1024, ttl=300):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._version = None
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0
+        }
+    
+    def get_or_compute(self, key, compute, version=None):
+        """Return the cached value for key, computing and storing it on a miss"""
+        now = time.monotonic()
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return entry[2]
+                self._remove(key)
+                self._stats['expirations'] += 1
+            self._stats['misses'] += 1
+        
+        # Compute outside the lock so slow misses don't serialise requests
+        value = compute()
+        
+        with self._lock:
+            if version == self._version:
+                self._store(key, value, now + self.ttl)
+        return value
+    
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._stats['invalidations'] += 1
+    
+    def stats(self):
+        """Hit/miss/eviction counters and current usage"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._bytes
+            lookups = stats['hits'] + stats['misses']
+            stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
+    
+    def _check_version(self, version):
+        if version != self._version:
+            if self._entries:
+                self._stats['invalidations'] += 1
+            self._entries.clear()
+            self._bytes = 0
+            self._version = version
+    
+    def _store(self, key, value, expires_at):
+        size = _size_of(value)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        
+        self._entries[key] = (expires_at, size, value)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._stats['evictions'] += 1
+    
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
@@ -0,0 +1,19 @@
+"""
+Convert the CSV datasets to a columnar format (one-time)
+
+    python convert_data.py --format parquet
+
+The engine's load_data() picks up the columnar files automatically.
+"""
+import argparse
+from recommendation_engine import FlipkartRecommendationEngine
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert CSV datasets to a columnar format")
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--format', choices=['parquet', 'feather'], default='parquet')
+    args = parser.parse_args()
+    
+    engine = FlipkartRecommendationEngine(data_dir=args.data_dir)
+    engine.load_data(data_format='csv')
+    engine.save_data(data_format=args.format)
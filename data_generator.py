@@ -1,12 +1,22 @@
 import pandas as pd
 import numpy as np
-import random
-from datetime import datetime, timedelta
+import argparse
+import os
+from datetime import datetime
+
+# Relative traffic per hour of day (quiet nights, evening peak)
+HOURLY_TRAFFIC = np.array([
+    3, 2, 1, 1, 1, 2, 3, 5, 7, 8, 9, 10,
+    11, 10, 9, 9, 10, 12, 14, 16, 17, 15, 11, 6
+], dtype=np.float64)
+
+# Seeded runs end on a fixed date so the same seed gives the same data every day
+SEEDED_END_DATE = '2025-01-01'
 
 class FlipkartDataGenerator:
     """Generate synthetic Flipkart product and user interaction data"""
     
-    def __init__(self):
+    def __init__(self, seed=None, product_skew=0.8, user_skew=0.6, end_date=None):
         self.categories = ['Electronics', 'Fashion', 'Home & Kitchen', 'Books', 'Sports', 'Beauty', 'Toys']
         self.brands = ['Samsung', 'Apple', 'Nike', 'Adidas', 'Sony', 'LG', 'Puma', 'Levi\'s', 'HP', 'Dell']
         
@@ -19,89 +29,188 @@ class FlipkartDataGenerator:
             'Beauty': ['Face Cream', 'Shampoo', 'Lipstick', 'Perfume', 'Face Wash', 'Hair Oil'],
             'Toys': ['Action Figure', 'Board Game', 'Puzzle', 'Doll', 'Remote Car', 'Building Blocks']
         }
+        
+        # Zipf exponents for product popularity and user activity (0 = uniform)
+        self.product_skew = product_skew
+        self.user_skew = user_skew
+        self.rng = np.random.default_rng(seed)
+        
+        # Timestamps count back from midnight of end_date (default today, or
+        # SEEDED_END_DATE when seeded)
+        if end_date is None:
+            end_date = SEEDED_END_DATE if seed is not None else datetime.now().date()
+        self.end_date = np.datetime64(end_date, 's')
+    
+    def _ids(self, prefix, n):
+        """Sequential ids like PROD0001, as a NumPy string array"""
+        numbers = np.char.zfill(np.arange(1, n + 1).astype(str), 4)
+        return np.char.add(prefix, numbers)
+    
+    def _zipf_cdf(self, n, skew):
+        """Cumulative sampling weights, rank^-skew over a random ranking"""
+        ranks = self.rng.permutation(n) + 1
+        weights = ranks.astype(np.float64) ** -skew
+        cdf = np.cumsum(weights)
+        return cdf / cdf[-1]
     
     def generate_products(self, n_products=500):
         """Generate synthetic product data"""
-        products = []
+        rng = self.rng
+        categories = rng.integers(len(self.categories), size=n_products)
+        brands = np.array(self.brands)[rng.integers(len(self.brands), size=n_products)]
         
-        for i in range(n_products):
-            category = random.choice(self.categories)
-            product_name = random.choice(self.product_names[category])
-            brand = random.choice(self.brands)
-            
-            product = {
-                'product_id': f'PROD{i+1:04d}',
-                'product_name': f'{brand} {product_name}',
-                'category': category,
-                'brand': brand,
-                'price': round(random.uniform(500, 50000), 2),
-                'rating': round(random.uniform(3.0, 5.0), 1),
-                'num_reviews': random.randint(10, 5000),
-                'discount': random.choice([0, 5, 10, 15, 20, 25, 30, 40, 50]),
-                'stock': random.randint(0, 500)
-            }
-            products.append(product)
+        # Names are stored flat; pick uniformly within each product's category
+        names = np.concatenate([self.product_names[c] for c in self.categories])
+        counts = np.array([len(self.product_names[c]) for c in self.categories])
+        offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        name_idx = offsets[categories] + (rng.random(n_products) * counts[categories]).astype(int)
         
-        return pd.DataFrame(products)
+        return pd.DataFrame({
+            'product_id': self._ids('PROD', n_products),
+            'product_name': np.char.add(np.char.add(brands, ' '), names[name_idx]),
+            'category': np.array(self.categories)[categories],
+            'brand': brands,
+            'price': np.round(rng.uniform(500, 50000, n_products), 2),
+            'rating': np.round(rng.uniform(3.0, 5.0, n_products), 1),
+            'num_reviews': rng.integers(10, 5001, n_products),
+            'discount': rng.choice([0, 5, 10, 15, 20, 25, 30, 40, 50], n_products),
+            'stock': rng.integers(0, 501, n_products)
+        })
     
     def generate_users(self, n_users=1000):
         """Generate synthetic user data"""
-        users = []
+        rng = self.rng
+        days = rng.integers(30, 1826, n_users).astype('timedelta64[D]')
         
-        for i in range(n_users):
-            user = {
-                'user_id': f'USER{i+1:04d}',
-                'age': random.randint(18, 65),
-                'gender': random.choice(['M', 'F']),
-                'location': random.choice(['Mumbai', 'Delhi', 'Bangalore', 'Hyderabad', 'Chennai', 'Kolkata']),
-                'member_since': (datetime.now() - timedelta(days=random.randint(30, 1825))).strftime('%Y-%m-%d')
-            }
-            users.append(user)
+        return pd.DataFrame({
+            'user_id': self._ids('USER', n_users),
+            'age': rng.integers(18, 66, n_users),
+            'gender': rng.choice(['M', 'F'], n_users),
+            'location': rng.choice(['Mumbai', 'Delhi', 'Bangalore', 'Hyderabad', 'Chennai', 'Kolkata'], n_users),
+            'member_since': np.datetime_as_string(self.end_date.astype('datetime64[D]') - days)
+        })
+    
+    def iter_interactions(self, products_df, users_df, n_interactions=5000, chunk_size=1000000):
+        """Yield interaction DataFrames of at most chunk_size rows"""
+        product_ids = products_df['product_id'].to_numpy(dtype=str)
+        user_ids = users_df['user_id'].to_numpy(dtype=str)
+        product_cdf = self._zipf_cdf(len(product_ids), self.product_skew)
+        user_cdf = self._zipf_cdf(len(user_ids), self.user_skew)
+        hour_cdf = np.cumsum(HOURLY_TRAFFIC) / HOURLY_TRAFFIC.sum()
         
-        return pd.DataFrame(users)
+        rng = self.rng
+        for start in range(0, n_interactions, chunk_size):
+            size = min(chunk_size, n_interactions - start)
+            
+            # Inverse-CDF sampling keeps each chunk O(size log n)
+            users = np.searchsorted(user_cdf, rng.random(size), side='right')
+            products = np.searchsorted(product_cdf, rng.random(size), side='right')
+            hours = np.searchsorted(hour_cdf, rng.random(size), side='right')
+            
+            # Seconds back from end_date: whole days, then a time of day
+            days = rng.integers(1, 366, size)
+            seconds = days * 86400 - hours * 3600 - rng.integers(0, 3600, size)
+            
+            # 50% view, 33% cart, 17% purchase; half the rows carry a 3-5 rating
+            interaction_type = np.array(['view', 'cart', 'purchase'])[
+                np.searchsorted([3, 5], rng.integers(0, 6, size), side='right')
+            ]
+            rating = np.where(
+                rng.random(size) < 0.5,
+                np.nan,
+                rng.integers(3, 6, size)
+            ).astype(np.float32)
+            
+            yield pd.DataFrame({
+                'user_id': user_ids[np.minimum(users, len(user_ids) - 1)],
+                'product_id': product_ids[np.minimum(products, len(product_ids) - 1)],
+                'interaction_type': interaction_type,
+                'rating': rating,
+                'timestamp': self.end_date - seconds.astype('timedelta64[s]')
+            })
     
     def generate_interactions(self, products_df, users_df, n_interactions=5000):
         """Generate user-product interactions (views, purchases, ratings)"""
-        interactions = []
-        
-        product_ids = products_df['product_id'].tolist()
-        user_ids = users_df['user_id'].tolist()
-        
-        for _ in range(n_interactions):
-            interaction = {
-                'user_id': random.choice(user_ids),
-                'product_id': random.choice(product_ids),
-                'interaction_type': random.choice(['view', 'view', 'view', 'cart', 'cart', 'purchase']),
-                'rating': random.choice([None, None, None, 3, 4, 5]),
-                'timestamp': (datetime.now() - timedelta(days=random.randint(1, 365))).strftime('%Y-%m-%d %H:%M:%S')
-            }
-            interactions.append(interaction)
-        
-        return pd.DataFrame(interactions)
+        return pd.concat(
+            self.iter_interactions(products_df, users_df, n_interactions),
+            ignore_index=True
+        )
     
-    def save_data(self):
-        """Generate and save all datasets"""
+    def save_data(self, n_products=500, n_users=1000, n_interactions=5000, data_dir='data',
+                  data_format='csv', chunk_size=1000000):
+        """Generate and save all datasets, streaming interactions in chunks"""
+        if data_format not in ('csv', 'parquet'):
+            raise ValueError(f"Unknown data format '{data_format}'")
+        
         print("Generating products...")
-        products_df = self.generate_products(500)
-        products_df.to_csv('data/products.csv', index=False)
+        products_df = self.generate_products(n_products)
+        self._write(products_df, data_dir, 'products', data_format)
         print(f"✅ Generated {len(products_df)} products")
         
         print("Generating users...")
-        users_df = self.generate_users(1000)
-        users_df.to_csv('data/users.csv', index=False)
+        users_df = self.generate_users(n_users)
+        self._write(users_df, data_dir, 'users', data_format)
         print(f"✅ Generated {len(users_df)} users")
         
         print("Generating interactions...")
-        interactions_df = self.generate_interactions(products_df, users_df, 5000)
-        interactions_df.to_csv('data/interactions.csv', index=False)
-        print(f"✅ Generated {len(interactions_df)} interactions")
+        path = os.path.join(data_dir, f'interactions.{data_format}')
+        writer = None
+        written = 0
+        try:
+            for chunk in self.iter_interactions(products_df, users_df, n_interactions, chunk_size):
+                if data_format == 'csv':
+                    chunk.to_csv(path, mode='a' if written else 'w', header=not written, index=False)
+                else:
+                    import pyarrow as pa
+                    import pyarrow.parquet as pq
+                    
+                    table = pa.Table.from_pandas(chunk, preserve_index=False)
+                    if writer is None:
+                        writer = pq.ParquetWriter(path, table.schema)
+                    writer.write_table(table)
+                written += len(chunk)
+                if n_interactions > chunk_size:
+                    print(f"  {written}/{n_interactions} interactions")
+        finally:
+            if writer is not None:
+                writer.close()
+        print(f"✅ Generated {written} interactions")
         
-        return products_df, users_df, interactions_df
+        return products_df, users_df
+    
+    def _write(self, df, data_dir, name, data_format):
+        """Write one small table in the chosen format"""
+        path = os.path.join(data_dir, f'{name}.{data_format}')
+        if data_format == 'csv':
+            df.to_csv(path, index=False)
+        else:
+            df.to_parquet(path, index=False)
 
 if __name__ == "__main__":
-    import os
-    os.makedirs('data', exist_ok=True)
+    parser = argparse.ArgumentParser(description='Generate synthetic Flipkart datasets')
+    parser.add_argument('--products', type=int, default=500)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--interactions', type=int, default=5000)
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv')
+    parser.add_argument('--chunk-size', type=int, default=1000000)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--end-date', default=None,
+                        help=f'Last day of generated activity, YYYY-MM-DD '
+                             f'(default: today, or {SEEDED_END_DATE} with --seed)')
+    parser.add_argument('--product-skew', type=float, default=0.8,
+                        help='Zipf exponent of product popularity (0 = uniform)')
+    parser.add_argument('--user-skew', type=float, default=0.6,
+                        help='Zipf exponent of user activity (0 = uniform)')
+    args = parser.parse_args()
+    
+    os.makedirs(args.data_dir, exist_ok=True)
     
-    generator = FlipkartDataGenerator()
-    generator.save_data()
+    generator = FlipkartDataGenerator(
+        args.seed, args.product_skew, args.user_skew, end_date=args.end_date
+    )
+    generator.save_data(
+        args.products, args.users, args.interactions, args.data_dir,
+        data_format=args.format, chunk_size=args.chunk_size
+    )
     print("\n✅ All data generated successfully!")
\ No newline at end of file
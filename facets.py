@@ -0,0 +1,151 @@
+"""
+Faceted product filters and cursor pagination.
+
+``FacetIndex`` is built once from the catalogue when data is loaded.
+Category, brand and in-stock have one packed bitmap per value (one bit
+per product row). Price, rating and discount each keep a sorted array of
+values, so each range bound is one binary search. A filter is the AND
+of one bitmap per facet; values of one facet (e.g. two brands) are ORed.
+
+Filters are a tuple of ``(name, value)`` pairs so they can be part of
+cache and batching keys:
+
+    filters = parse_filters({'brand': ['Sony', 'LG'], 'max_price': '5000'})
+    mask = index.mask(filters)  # bool per product row, or None
+"""
+import base64
+
+import numpy as np
+
+# Multi-valued facets matched exactly
+VALUE_FACETS = ('category', 'brand')
+
+# Range filters as (filter name, column, side); 'min' keeps values >= bound
+RANGE_FILTERS = (
+    ('min_price', 'price', 'min'),
+    ('max_price', 'price', 'max'),
+    ('min_rating', 'rating', 'min'),
+    ('min_discount', 'discount', 'min')
+)
+
+def _values(params, name):
+    """Every value given for name, from query args (getlist) or a JSON object"""
+    if hasattr(params, 'getlist'):
+        return params.getlist(name)
+    value = params.get(name)
+    if value is None:
+        return []
+    return list(value) if isinstance(value, (list, tuple)) else [value]
+
+def parse_filters(params):
+    """Validated, hashable filters from query args or a JSON object; None if empty"""
+    filters = []
+    for name in VALUE_FACETS:
+        values = [str(value) for value in _values(params, name) if str(value)]
+        if values:
+            filters.append((name, tuple(sorted(set(values)))))
+    
+    for name, _, _ in RANGE_FILTERS:
+        values = _values(params, name)
+        if values and str(values[-1]) != '':
+            try:
+                filters.append((name, float(values[-1])))
+            except ValueError:
+                raise ValueError(f"{name} must be a number") from None
+    
+    values = _values(params, 'in_stock')
+    if values and str(values[-1]).lower() in ('1', 'true', 'yes'):
+        filters.append(('in_stock', True))
+    
+    return tuple(filters) or None
+
+def encode_cursor(position):
+    """Opaque pagination cursor for a position"""
+    return base64.urlsafe_b64encode(str(position).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Position from encode_cursor(); 0 for no cursor"""
+    if not cursor:
+        return 0
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        position = int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError('Invalid cursor') from None
+    if position < 0:
+        raise ValueError('Invalid cursor')
+    return position
+
+class FacetIndex:
+    """Bitmap and sorted-array indexes over catalogue rows"""
+    
+    def __init__(self, products_df):
+        self.n_products = len(products_df)
+        
+        self.bitmaps = {}
+        for facet in VALUE_FACETS:
+            codes, values = products_df[facet].factorize()
+            self.bitmaps[facet] = {
+                value: self._pack(codes == code) for code, value in enumerate(values)
+            }
+        self.in_stock = self._pack(products_df['stock'].to_numpy() > 0)
+        
+        self.sorted = {}
+        for column in {column for _, column, _ in RANGE_FILTERS}:
+            self._index_column(column, products_df[column].to_numpy())
+    
+    def with_values(self, column, values):
+        """Copy of the index with one range column re-indexed"""
+        index = object.__new__(FacetIndex)
+        index.__dict__.update(self.__dict__)
+        index.sorted = dict(self.sorted)
+        index._index_column(column, np.asarray(values))
+        return index
+    
+    def mask(self, filters):
+        """Bool array of the product rows matching every filter, None if unfiltered"""
+        if not filters:
+            return None
+        
+        bitmaps = []
+        for name, value in filters:
+            if name in self.bitmaps:
+                # Values within a facet are ORed; unknown values match nothing
+                empty = np.zeros_like(self.in_stock)
+                bitmaps.append(np.bitwise_or.reduce(
+                    [self.bitmaps[name].get(item, empty) for item in value]
+                ))
+            elif name == 'in_stock':
+                if value:
+                    bitmaps.append(self.in_stock)
+            else:
+                bitmaps.append(self._range_bitmap(name, value))
+        
+        if not bitmaps:
+            return None
+        combined = np.bitwise_and.reduce(bitmaps)
+        return np.unpackbits(combined, count=self.n_products).astype(bool)
+    
+    def _index_column(self, column, values):
+        # Floats keep their dtype so bounds compare exactly as stored
+        if values.dtype.kind != 'f':
+            values = values.astype(np.float64)
+        order = np.argsort(values, kind='stable')
+        self.sorted[column] = (order, values[order])
+    
+    def _range_bitmap(self, name, bound):
+        """Bitmap of the rows on the kept side of one range bound"""
+        column, side = next((c, s) for n, c, s in RANGE_FILTERS if n == name)
+        order, values = self.sorted[column]
+        bound = values.dtype.type(bound)
+        if side == 'min':
+            rows = order[np.searchsorted(values, bound, side='left'):]
+        else:
+            rows = order[:np.searchsorted(values, bound, side='right')]
+        
+        bits = np.zeros(self.n_products, dtype=bool)
+        bits[rows] = True
+        return self._pack(bits)
+    
+    def _pack(self, bits):
+        return np.packbits(np.asarray(bits, dtype=bool))
@@ -0,0 +1,38 @@
+"""
+Gunicorn settings for the production server (see wsgi.py).
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+
+# Threads per worker for concurrent requests; the engine is read-only
+# on the serving path apart from locked ingest swaps
+worker_class = 'gthread'
+threads = int(os.environ.get('THREADS', 4))
+
+# Load the models once in the master, then fork
+preload_app = True
+
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+
+def on_starting(server):
+    """Refuse a tcp:// interaction stream with several workers"""
+    # Only one worker could bind the port; the others would serve stale models
+    stream = os.environ.get('INTERACTION_STREAM', '')
+    if stream.startswith('tcp://') and server.cfg.workers > 1:
+        raise RuntimeError(
+            f"INTERACTION_STREAM={stream} binds one port, so it needs a single "
+            f"worker (got {server.cfg.workers}); set WEB_CONCURRENCY=1 or use a file stream"
+        )
+
+def post_fork(server, worker):
+    """Threads don't survive fork, so start background threads per worker"""
+    from app import start_ingestor, start_service
+    start_ingestor()
+    start_service()
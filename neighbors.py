@@ -0,0 +1,353 @@
+"""
+Nearest-neighbour backends for user-based collaborative filtering.
+
+Every backend exposes the subset of the scikit-learn ``NearestNeighbors``
+API the engine uses (``fit`` and ``kneighbors``) with cosine distance.
+``brute`` is the exact reference; ``lsh`` and ``ivf`` are approximate
+indexes that only score a candidate subset of users per query.
+``update`` returns a new index after some rows changed, re-hashing or
+re-assigning only those rows (LSH planes and IVF centroids are kept).
+
+Run this module to print a recall-vs-latency report against brute force:
+
+    python neighbors.py
+"""
+import time
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.neighbors import NearestNeighbors
+from sklearn.preprocessing import normalize
+
+class BruteForceNeighbors:
+    """Exact cosine KNN over all users (reference backend)"""
+    
+    def __init__(self, n_neighbors=20):
+        self.n_neighbors = n_neighbors
+        self._model = None
+    
+    def fit(self, X):
+        """Index the user-item matrix"""
+        self._model = NearestNeighbors(
+            metric='cosine',
+            algorithm='brute',
+            n_neighbors=self.n_neighbors
+        )
+        self._model.fit(X)
+        return self
+    
+    def kneighbors(self, X, n_neighbors=None, return_distance=True):
+        """Find the nearest users for each query row"""
+        return self._model.kneighbors(
+            X,
+            n_neighbors=n_neighbors or self.n_neighbors,
+            return_distance=return_distance
+        )
+    
+    def update(self, X, rows):
+        """New index over X after rows changed; brute force just re-indexes"""
+        return type(self)(self.n_neighbors).fit(X)
+    
+    def get_state(self):
+        """Arrays needed to restore the index (brute force has none)"""
+        return {}
+    
+    def set_state(self, state, X):
+        """Restore the index; brute force simply re-indexes X"""
+        return self.fit(X)
+
+def _reinsert(order, keys, rows, new_keys, n_rows):
+    """Move rows to new_keys in a (key, row)-sorted list, keeping its order"""
+    changed = np.zeros(n_rows, dtype=bool)
+    changed[rows] = True
+    keep = ~changed[order]
+    order, keys = order[keep], keys[keep]
+    
+    # Rows with equal keys stay in row order, as a stable sort leaves them
+    by_key = np.lexsort((rows, new_keys))
+    rows, new_keys = rows[by_key], new_keys[by_key]
+    slots = np.searchsorted(keys * n_rows + order, new_keys * n_rows + rows)
+    return np.insert(order, slots, rows), np.insert(keys, slots, new_keys)
+
+class _CandidateIndex:
+    """Shared exact re-ranking over per-query candidate sets"""
+    
+    # Index arrays saved alongside the normalised rows
+    _state_attrs = ()
+    
+    def __init__(self, n_neighbors=20):
+        self.n_neighbors = n_neighbors
+        self._X = None
+    
+    def fit(self, X):
+        """Store L2-normalised rows for exact re-ranking"""
+        self._X = normalize(csr_matrix(X, dtype=np.float64))
+        self._build(self._X)
+        return self
+    
+    def update(self, X, rows):
+        """New index over X where only rows (changed or appended) are re-indexed"""
+        index = object.__new__(type(self))
+        index.__dict__.update(self.__dict__)
+        index._X = normalize(csr_matrix(X, dtype=np.float64))
+        index._update(index._X, np.unique(np.asarray(rows, dtype=np.intp)))
+        return index
+    
+    def get_state(self):
+        """Arrays needed to restore the index without refitting"""
+        state = {
+            'X_data': self._X.data,
+            'X_indices': self._X.indices,
+            'X_indptr': self._X.indptr
+        }
+        state.update({name.lstrip('_'): getattr(self, name) for name in self._state_attrs})
+        return state
+    
+    def set_state(self, state, X):
+        """Restore a fitted index from get_state() arrays"""
+        self._X = csr_matrix(
+            (state['X_data'], state['X_indices'], state['X_indptr']),
+            shape=X.shape,
+            copy=False
+        )
+        for name in self._state_attrs:
+            setattr(self, name, state[name.lstrip('_')])
+        return self
+    
+    def kneighbors(self, X, n_neighbors=None, return_distance=True):
+        """Find the nearest users among each query's candidates"""
+        n_neighbors = min(n_neighbors or self.n_neighbors, self._X.shape[0])
+        queries = normalize(csr_matrix(X, dtype=np.float64))
+        candidate_sets = self._candidates(queries)
+        
+        distances = np.empty((queries.shape[0], n_neighbors))
+        indices = np.empty((queries.shape[0], n_neighbors), dtype=np.intp)
+        for i, candidates in enumerate(candidate_sets):
+            # Too few candidates: fall back to an exhaustive scan
+            if len(candidates) < n_neighbors:
+                candidates = np.arange(self._X.shape[0])
+            
+            sims = (self._X[candidates] @ queries[i].T).toarray().ravel()
+            if n_neighbors < len(sims):
+                top = np.argpartition(-sims, n_neighbors - 1)[:n_neighbors]
+            else:
+                top = np.arange(len(sims))
+            top = top[np.lexsort((candidates[top], -sims[top]))]
+            
+            indices[i] = candidates[top]
+            distances[i] = 1.0 - sims[top]
+        
+        if return_distance:
+            return distances, indices
+        return indices
+
+class LSHNeighbors(_CandidateIndex):
+    """Random-projection LSH; more tables raise recall, more bits cut latency"""
+    
+    _state_attrs = ('_planes', '_order', '_codes')
+    
+    def __init__(self, n_neighbors=20, n_tables=8, n_bits=8, random_state=0):
+        super().__init__(n_neighbors)
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        self.random_state = random_state
+    
+    def _hash(self, X):
+        """Sign-of-projection hash codes, shape (n_tables, n_rows)"""
+        weights = 1 << np.arange(self.n_bits, dtype=np.int64)
+        return np.stack([
+            ((X @ planes) > 0) @ weights
+            for planes in self._planes
+        ])
+    
+    def _build(self, X):
+        rng = np.random.default_rng(self.random_state)
+        self._planes = rng.standard_normal((self.n_tables, X.shape[1], self.n_bits))
+        
+        # Per table: users sorted by bucket code, for searchsorted lookups
+        codes = self._hash(X)
+        self._order = np.argsort(codes, axis=1, kind='stable')
+        self._codes = np.take_along_axis(codes, self._order, axis=1)
+    
+    def _update(self, X, rows):
+        # Old rows are zero in new product columns, so only new planes are drawn
+        n_features = self._planes.shape[1]
+        if X.shape[1] > n_features:
+            rng = np.random.default_rng([self.random_state, n_features])
+            self._planes = np.concatenate([
+                self._planes,
+                rng.standard_normal((self.n_tables, X.shape[1] - n_features, self.n_bits))
+            ], axis=1)
+        
+        codes = self._hash(X[rows])
+        tables = [
+            _reinsert(self._order[t], self._codes[t], rows, codes[t], X.shape[0])
+            for t in range(self.n_tables)
+        ]
+        self._order = np.stack([order for order, _ in tables])
+        self._codes = np.stack([table_codes for _, table_codes in tables])
+    
+    def _candidates(self, queries):
+        codes = self._hash(queries)
+        starts = np.stack([
+            np.searchsorted(self._codes[t], codes[t], side='left')
+            for t in range(self.n_tables)
+        ])
+        ends = np.stack([
+            np.searchsorted(self._codes[t], codes[t], side='right')
+            for t in range(self.n_tables)
+        ])
+        
+        return [
+            np.unique(np.concatenate([
+                self._order[t, starts[t, i]:ends[t, i]]
+                for t in range(self.n_tables)
+            ]))
+            for i in range(queries.shape[0])
+        ]
+
+class IVFNeighbors(_CandidateIndex):
+    """Inverted-file index over spherical k-means lists; n_probe sets recall"""
+    
+    _state_attrs = ('_centroids', '_list_order', '_list_offsets')
+    
+    def __init__(self, n_neighbors=20, n_lists=16, n_probe=4, n_iter=10, random_state=0):
+        super().__init__(n_neighbors)
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.random_state = random_state
+    
+    def _build(self, X):
+        rng = np.random.default_rng(self.random_state)
+        n_lists = min(self.n_lists, X.shape[0])
+        centroids = X[rng.choice(X.shape[0], n_lists, replace=False)].toarray()
+        
+        # Spherical k-means: assign by cosine, re-centre, re-normalise
+        for _ in range(self.n_iter):
+            assignment = np.asarray((X @ centroids.T).argmax(axis=1)).ravel()
+            members = csr_matrix(
+                (np.ones(X.shape[0]), (assignment, np.arange(X.shape[0]))),
+                shape=(n_lists, X.shape[0])
+            )
+            sums = np.asarray((members @ X).todense())
+            filled = np.asarray(members.sum(axis=1)).ravel() > 0
+            centroids[filled] = normalize(sums[filled])
+        
+        assignment = np.asarray((X @ centroids.T).argmax(axis=1)).ravel()
+        self._centroids = centroids
+        self._list_order = np.argsort(assignment, kind='stable')
+        self._list_offsets = np.concatenate(
+            ([0], np.cumsum(np.bincount(assignment, minlength=n_lists)))
+        )
+    
+    def _update(self, X, rows):
+        # Centroids are kept; they have no weight on new product columns
+        n_lists, n_features = self._centroids.shape
+        if X.shape[1] > n_features:
+            self._centroids = np.hstack([
+                self._centroids,
+                np.zeros((n_lists, X.shape[1] - n_features))
+            ])
+        
+        lists = np.repeat(np.arange(n_lists), np.diff(self._list_offsets))
+        assignment = np.asarray((X[rows] @ self._centroids.T).argmax(axis=1)).ravel()
+        self._list_order, lists = _reinsert(
+            self._list_order, lists, rows, assignment, X.shape[0]
+        )
+        self._list_offsets = np.concatenate(
+            ([0], np.cumsum(np.bincount(lists, minlength=n_lists)))
+        )
+    
+    def _candidates(self, queries):
+        n_probe = min(self.n_probe, len(self._centroids))
+        centroid_sims = np.asarray(queries @ self._centroids.T)
+        probes = np.argpartition(-centroid_sims, n_probe - 1, axis=1)[:, :n_probe]
+        
+        return [
+            np.concatenate([
+                self._list_order[self._list_offsets[l]:self._list_offsets[l + 1]]
+                for l in lists
+            ])
+            for lists in probes
+        ]
+
+NEIGHBOR_BACKENDS = {
+    'brute': BruteForceNeighbors,
+    'lsh': LSHNeighbors,
+    'ivf': IVFNeighbors
+}
+
+def make_neighbors(backend='brute', **params):
+    """Create a neighbour backend by name"""
+    if backend not in NEIGHBOR_BACKENDS:
+        raise ValueError(
+            f"Unknown neighbour backend '{backend}', "
+            f"choose from {sorted(NEIGHBOR_BACKENDS)}"
+        )
+    return NEIGHBOR_BACKENDS[backend](**params)
+
+def recall_latency_report(user_item_matrix, configs, k=10, n_queries=200, random_state=0):
+    """Compare backends against brute force on recall@k and query latency"""
+    rng = np.random.default_rng(random_state)
+    n_queries = min(n_queries, user_item_matrix.shape[0])
+    query_rows = rng.choice(user_item_matrix.shape[0], n_queries, replace=False)
+    queries = user_item_matrix[query_rows]
+    
+    reference = BruteForceNeighbors().fit(user_item_matrix)
+    exact_distances, exact = reference.kneighbors(queries, n_neighbors=k)
+    
+    # Only neighbours with some overlap count; zero-similarity users all tie
+    relevant = [e[d < 1.0 - 1e-12] for d, e in zip(exact_distances, exact)]
+    
+    results = []
+    for name, params in configs:
+        start = time.perf_counter()
+        index = make_neighbors(name, **params).fit(user_item_matrix)
+        build_time = time.perf_counter() - start
+        
+        # Single-row queries, as served by the API
+        found = []
+        start = time.perf_counter()
+        for i in range(n_queries):
+            found.append(index.kneighbors(queries[i], n_neighbors=k, return_distance=False)[0])
+        latency = (time.perf_counter() - start) / n_queries
+        
+        recall = np.mean([
+            len(np.intersect1d(f, r)) / len(r)
+            for f, r in zip(found, relevant)
+            if len(r)
+        ])
+        results.append({
+            'backend': name,
+            'params': params,
+            'recall_at_k': round(float(recall), 4),
+            'latency_ms': round(latency * 1000, 3),
+            'build_s': round(build_time, 3)
+        })
+    
+    return results
+
+if __name__ == "__main__":
+    from recommendation_engine import FlipkartRecommendationEngine
+    
+    engine = FlipkartRecommendationEngine()
+    engine.load_data()
+    engine.prepare_user_item_matrix()
+    
+    configs = [
+        ('brute', {}),
+        ('lsh', {'n_tables': 8, 'n_bits': 8}),
+        ('lsh', {'n_tables': 16, 'n_bits': 6}),
+        ('lsh', {'n_tables': 32, 'n_bits': 4}),
+        ('ivf', {'n_lists': 16, 'n_probe': 2}),
+        ('ivf', {'n_lists': 16, 'n_probe': 4}),
+        ('ivf', {'n_lists': 16, 'n_probe': 8})
+    ]
+    
+    print(f"\n{'backend':<8} {'params':<34} {'recall@10':>10} {'latency ms':>11} {'build s':>8}")
+    for row in recall_latency_report(engine.user_item_matrix, configs):
+        print(
+            f"{row['backend']:<8} {str(row['params']):<34} "
+            f"{row['recall_at_k']:>10.3f} {row['latency_ms']:>11.3f} {row['build_s']:>8.3f}"
+        )
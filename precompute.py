@@ -0,0 +1,154 @@
+"""
+Offline job that precomputes recommendations for every user.
+
+Results are written as fixed-width int32 arrays (product row indices,
+padded with -1) that the API can memory-map and serve without loading
+any model:
+
+    python precompute.py --output precomputed --n 20 --workers 4
+"""
+import argparse
+import json
+import os
+from datetime import datetime
+from multiprocessing import Pool
+
+import numpy as np
+
+from recommendation_engine import (
+    FlipkartRecommendationEngine, _new_array_set, _publish_array_set
+)
+
+METHODS = ('hybrid', 'collaborative')
+
+# Engine loaded once per worker process
+_worker_engine = None
+
+def _init_worker():
+    """Load trained models in a pool worker"""
+    global _worker_engine
+    _worker_engine = FlipkartRecommendationEngine()
+    _worker_engine.load_models()
+
+def _compute_chunk(args):
+    """Compute padded recommendation rows for a slice of users"""
+    start, user_ids, methods, n_recommendations = args
+    engine = _worker_engine
+    
+    rows = {}
+    for method in methods:
+        if method == 'hybrid':
+            batch = engine.get_hybrid_recommendations_batch(user_ids, n_recommendations)
+        else:
+            batch = engine.get_collaborative_recommendations_batch(user_ids, n_recommendations)
+        
+        block = np.full((len(user_ids), n_recommendations), -1, dtype=np.int32)
+        for i, recs in enumerate(batch):
+            block[i, :len(recs)] = [engine.product_to_idx[p] for p in recs]
+        rows[method] = block
+    
+    return start, rows
+
+def precompute(output_dir, n_recommendations=20, methods=METHODS,
+               workers=None, chunk_size=500):
+    """Compute recommendations for all users and write them to output_dir"""
+    engine = FlipkartRecommendationEngine()
+    engine.load_data()
+    
+    # Rows are stored sorted by user id so lookups can binary search
+    user_ids = np.sort(engine.users_df['user_id'].to_numpy(dtype=str))
+    product_ids = engine.products_df['product_id'].to_numpy(dtype=str)
+    
+    # A serving store may have the current arrays mapped, so each run writes
+    # a fresh directory and only then switches the manifest to it
+    created = datetime.now()
+    arrays_dir = _new_array_set(output_dir, created)
+    np.save(os.path.join(arrays_dir, 'user_ids.npy'), user_ids)
+    np.save(os.path.join(arrays_dir, 'product_ids.npy'), product_ids)
+    
+    stores = {
+        method: np.lib.format.open_memmap(
+            os.path.join(arrays_dir, f'{method}.npy'),
+            mode='w+',
+            dtype=np.int32,
+            shape=(len(user_ids), n_recommendations)
+        )
+        for method in methods
+    }
+    
+    chunks = [
+        (start, user_ids[start:start + chunk_size].tolist(), methods, n_recommendations)
+        for start in range(0, len(user_ids), chunk_size)
+    ]
+    
+    with Pool(workers, initializer=_init_worker) as pool:
+        for start, rows in pool.imap_unordered(_compute_chunk, chunks):
+            for method, block in rows.items():
+                stores[method][start:start + len(block)] = block
+            print(f"  {min(start + chunk_size, len(user_ids))}/{len(user_ids)} users")
+    
+    for store in stores.values():
+        store.flush()
+    
+    _publish_array_set(output_dir, {
+        'created': created.isoformat(timespec='seconds'),
+        'arrays_dir': os.path.basename(arrays_dir),
+        'methods': list(methods),
+        'n_recommendations': n_recommendations,
+        'n_users': len(user_ids),
+        'n_products': len(product_ids)
+    })
+    
+    print(f"✅ Precomputed recommendations for {len(user_ids)} users")
+
+class RecommendationStore:
+    """Read-only, memory-mapped view of precomputed recommendations"""
+    
+    def __init__(self, path):
+        with open(os.path.join(path, 'manifest.json')) as f:
+            self.manifest = json.load(f)
+        
+        # The manifest names the directory of the current run's arrays
+        path = os.path.join(path, self.manifest['arrays_dir'])
+        self.user_ids = np.load(os.path.join(path, 'user_ids.npy'), mmap_mode='r')
+        self.product_ids = np.load(os.path.join(path, 'product_ids.npy'), mmap_mode='r')
+        self.recommendations = {
+            method: np.load(os.path.join(path, f'{method}.npy'), mmap_mode='r')
+            for method in self.manifest['methods']
+        }
+    
+    def get(self, user_id, method='hybrid', n_recommendations=10):
+        """Get stored recommendations, or None if the user/method is missing"""
+        if method not in self.recommendations:
+            return None
+        
+        row = np.searchsorted(self.user_ids, user_id)
+        if row >= len(self.user_ids) or self.user_ids[row] != user_id:
+            return None
+        
+        indices = self.recommendations[method][row, :n_recommendations]
+        return self.product_ids[indices[indices >= 0]].tolist()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--output', default='precomputed')
+    parser.add_argument('--n', type=int, default=20)
+    parser.add_argument('--methods', nargs='+', choices=METHODS, default=list(METHODS))
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=500)
+    parser.add_argument('--train', action='store_true',
+                        help='train and save models before precomputing')
+    args = parser.parse_args()
+    
+    if args.train:
+        engine = FlipkartRecommendationEngine()
+        engine.train()
+        engine.save_models()
+    
+    precompute(
+        args.output,
+        n_recommendations=args.n,
+        methods=args.methods,
+        workers=args.workers,
+        chunk_size=args.chunk_size
+    )
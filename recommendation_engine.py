@@ -1,247 +1,1789 @@
 import pandas as pd
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.feature_extraction.text import TfidfVectorizer
-from scipy.sparse import csr_matrix
-from sklearn.neighbors import NearestNeighbors
-import joblib
+from scipy.sparse import coo_matrix, csr_matrix, diags, vstack
+from neighbors import make_neighbors
+from factorization import ImplicitALS
+from facets import FacetIndex
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+import hashlib
+import json
+import multiprocessing
 import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows: peak memory is not reported
+    resource = None
+
+# Bump when the saved model layout changes
+MODEL_FORMAT_VERSION = 6
+
+# Saved array sets kept in the model directory: the current one and the one
+# before it, which workers that read the old manifest may still be opening
+MODEL_VERSIONS_KEPT = 2
+
+# Implicit ratings per interaction type (purchase=5, cart=3, view=1)
+IMPLICIT_RATINGS = {
+    'purchase': 5,
+    'cart': 3,
+    'view': 1
+}
+
+# Interaction types that feed the user-item matrix
+CF_INTERACTION_TYPES = ['purchase', 'cart']
+
+# Collaborative scoring: KNN over user rows, implicit ALS factors, or
+# summed item-item neighbour lists
+COLLABORATIVE_METHODS = ('knn', 'als', 'item')
+
+# Below this many products, process start-up costs more than the
+# blocked similarity it would parallelise
+PARALLEL_CONTENT_MIN_PRODUCTS = 20000
+
+# Working memory per dense content block (per pool worker). Each cell holds
+# the float64 score, its negated copy and an int64 partition index
+CONTENT_BLOCK_BYTES = 256 * 1024 ** 2
+CONTENT_CELL_BYTES = 24
+
+# Ingested interactions are buffered in interaction_delta and folded into
+# interactions_df once they reach this share of it (and at least the minimum)
+INTERACTION_DELTA_SHARE = 0.1
+INTERACTION_DELTA_MIN_ROWS = 10000
+
+# Candidate generation and business rules for ranked recommendations
+RERANK_RULES = {
+    'candidates': 200,        # ids per candidate generator
+    'popular_weight': 0.1,    # blend weight of top-selling products
+    'category_weight': 0.1,   # blend weight of top products in the latest category
+    'in_stock': True,         # drop products with no stock
+    'discount_boost': 0.5,    # score x (1 + 0.5 * discount / 100)
+    'price_band_boost': 0.2,  # score x 1.2 inside the user's price band
+    'price_band_width': 0.5   # band: median recent price +/- 50%
+}
+
+# File extension per supported data format
+DATA_FORMATS = {
+    'csv': '.csv',
+    'parquet': '.parquet',
+    'feather': '.feather'
+}
+
+# Column dtypes; ids repeated across interactions are integer-coded categoricals
+DATA_DTYPES = {
+    'products': {
+        'product_id': 'str',
+        'product_name': 'str',
+        'category': 'category',
+        'brand': 'category',
+        'price': 'float64',
+        'rating': 'float64',
+        'num_reviews': 'int32',
+        'discount': 'int16',
+        'stock': 'int32'
+    },
+    'users': {
+        'user_id': 'str',
+        'age': 'int16',
+        'gender': 'category',
+        'location': 'category',
+        'member_since': 'str'
+    },
+    'interactions': {
+        'user_id': 'category',
+        'product_id': 'category',
+        'interaction_type': 'category',
+        'rating': 'float32',
+        'timestamp': 'datetime64[ns]'
+    }
+}
+
+# Buffered interactions keep ids as strings until they are compacted
+DELTA_DTYPES = {
+    column: 'str' if dtype == 'category' else dtype
+    for column, dtype in DATA_DTYPES['interactions'].items()
+}
+
+# Engine attributes derived from the interactions table; load_models() and
+# load_catalogue() leave some of them to be read on first use
+INTERACTION_STATE = (
+    'interactions_df',
+    'user_interaction_order',
+    'user_interaction_offsets',
+    'user_to_interactions',
+    'interaction_product_codes',
+    'interaction_products'
+)
+
+def _top_n(scores, n, tiebreak=None):
+    """Indices of the n highest scores, best first, ties by tiebreak"""
+    if tiebreak is None:
+        tiebreak = np.arange(len(scores))
+    if n <= 0 or len(scores) == 0:
+        return np.array([], dtype=np.intp)
+    
+    # Partition to the n-th best score, keeping every candidate tied with it
+    if n < len(scores):
+        kth = scores[np.argpartition(-scores, n - 1)[n - 1]]
+        candidates = np.flatnonzero(scores >= kth)
+    else:
+        candidates = np.arange(len(scores))
+    
+    order = np.lexsort((tiebreak[candidates], -scores[candidates]))
+    return candidates[order[:n]]
+
+def _masked(order, mask):
+    """Rows of a ranking that pass a facet mask (all rows if None)"""
+    return order if mask is None else order[mask[order]]
+
+def _rank_scores(n, k):
+    """Scores in (0, 1] falling linearly with rank, for ranked candidate lists"""
+    return 1 - np.arange(n) / k
+
+def interaction_ratings(interactions_df):
+    """Final user-item ratings for the interactions that feed collaborative filtering"""
+    # Filter only purchases and ratings
+    purchase_data = interactions_df[
+        interactions_df['interaction_type'].isin(CF_INTERACTION_TYPES)
+    ]
+    
+    # Create implicit ratings, then use explicit rating if available
+    implicit_rating = purchase_data['interaction_type'].map(
+        IMPLICIT_RATINGS
+    ).astype('float64')
+    
+    return pd.DataFrame({
+        'user_id': purchase_data['user_id'],
+        'product_id': purchase_data['product_id'],
+        'final_rating': purchase_data['rating'].astype('float64').fillna(implicit_rating)
+    })
+
+def implicit_weights(interactions_df):
+    """Summed view/cart/purchase weights per user-product pair, for ALS"""
+    weights = interactions_df['interaction_type'].map(IMPLICIT_RATINGS).astype('float64')
+    return pd.DataFrame({
+        'user_id': interactions_df['user_id'],
+        'product_id': interactions_df['product_id'],
+        'weight': weights
+    }).dropna(subset=['weight'])
+
+def _product_features(products_df):
+    """Text used for TF-IDF product vectors"""
+    return (
+        products_df['category'].astype(str) + ' ' +
+        products_df['brand'].astype(str) + ' ' +
+        products_df['product_name'].astype(str)
+    )
+
+def _rank_top_k(candidates, scores, k):
+    """Per row, keep the k best candidates ordered by score, then index"""
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    top_candidates = np.take_along_axis(candidates, top, axis=1)
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.lexsort((top_candidates, -top_scores), axis=1)
+    return (
+        np.take_along_axis(top_candidates, order, axis=1),
+        np.take_along_axis(top_scores, order, axis=1)
+    )
+
+def _content_block(tfidf_matrix, tfidf_t, start, end, k):
+    """Top-k content neighbours of rows start:end against every product"""
+    # TF-IDF rows are L2-normalised, so the dot product is the cosine
+    block = (tfidf_matrix[start:end] @ tfidf_t).toarray()
+    
+    # A product is never its own neighbour
+    rows = np.arange(end - start)
+    block[rows, rows + start] = -np.inf
+    
+    # Partition out the top K, then order just those K per row
+    candidates = np.broadcast_to(np.arange(tfidf_t.shape[1]), block.shape)
+    return _rank_top_k(candidates, block, k)
+
+# TF-IDF matrix and its transpose, held by each content index pool worker
+_worker_tfidf = None
+
+def _init_content_worker(tfidf_matrix):
+    """Receive the TF-IDF matrix once per pool worker"""
+    global _worker_tfidf
+    _worker_tfidf = (tfidf_matrix, tfidf_matrix.T.tocsc())
+
+def _worker_content_block(block):
+    """Compute one row block in a pool worker"""
+    start, end, k = block
+    return start, _content_block(*_worker_tfidf, start, end, k)
+
+def _peak_rss_mb(who=None):
+    """Peak resident memory in MB (RUSAGE_SELF by default), or None if unknown"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF if who is None else who).ru_maxrss
+    
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def _top_k_sparse_rows(block, k):
+    """Per CSR row, the k largest entries best first, padded with -1 / 0"""
+    rows = np.repeat(np.arange(block.shape[0]), np.diff(block.indptr))
+    
+    # Sort entries by row, score desc, column; rank = position within the row
+    order = np.lexsort((block.indices, -block.data, rows))
+    rank = np.arange(block.nnz) - block.indptr[rows[order]]
+    kept = rank < k
+    
+    neighbors = np.full((block.shape[0], k), -1, dtype=np.int32)
+    scores = np.zeros((block.shape[0], k), dtype=np.float32)
+    neighbors[rows[order[kept]], rank[kept]] = block.indices[order[kept]]
+    scores[rows[order[kept]], rank[kept]] = block.data[order[kept]]
+    return neighbors, scores
+
+def _timestamps_ns(timestamps):
+    """Timestamps as int64 nanoseconds"""
+    return pd.to_datetime(timestamps).values.astype('datetime64[ns]').astype(np.int64)
+
+def _take_rows(base, delta, positions):
+    """Rows at positions of base followed by delta, in the given order"""
+    positions = np.asarray(positions, dtype=np.intp)
+    in_delta = positions >= len(base)
+    if not in_delta.any():
+        return base.iloc[positions]
+    
+    rows = pd.concat([
+        base.iloc[positions[~in_delta]],
+        delta.iloc[positions[in_delta] - len(base)]
+    ])
+    return rows.iloc[np.argsort(np.argsort(in_delta, kind='stable'), kind='stable')]
+
+def _user_interaction_index(interactions_df):
+    """Row order grouped by user (newest first), group offsets and user lookup"""
+    user_codes, user_ids = pd.factorize(interactions_df['user_id'])
+    timestamps = _timestamps_ns(interactions_df['timestamp'])
+    
+    # Stable sort keeps file order for interactions with equal timestamps
+    order = np.lexsort((-timestamps, user_codes))
+    offsets = np.concatenate(
+        ([0], np.cumsum(np.bincount(user_codes, minlength=len(user_ids))))
+    )
+    user_to_interactions = {
+        user_id: group for group, user_id in enumerate(user_ids)
+    }
+    return order, offsets, user_to_interactions
+
+def _interaction_products(interactions_df):
+    """Per interaction row, a code into a table of product ids"""
+    codes, products = pd.factorize(interactions_df['product_id'])
+    return codes.astype(np.int32), np.asarray(products, dtype=str)
+
+def _empty_delta():
+    """An interaction buffer with no rows"""
+    return pd.DataFrame({
+        column: pd.Series(dtype=dtype) for column, dtype in DELTA_DTYPES.items()
+    })
+
+def _extend_interaction_index(index, base, delta, n_new):
+    """_user_interaction_index() after the last n_new delta rows were appended"""
+    order, offsets, user_to_interactions = index
+    new_rows = delta.iloc[len(delta) - n_new:]
+    user_to_interactions = dict(user_to_interactions)
+    for user_id in pd.unique(new_rows['user_id']):
+        if user_id not in user_to_interactions:
+            user_to_interactions[user_id] = len(user_to_interactions)
+    
+    # New users get empty groups at the end
+    n_groups = len(user_to_interactions)
+    offsets = np.concatenate([
+        offsets,
+        np.full(n_groups + 1 - len(offsets), offsets[-1], dtype=offsets.dtype)
+    ])
+    
+    # New rows by group, newest first, then in arrival order
+    groups = np.array(
+        [user_to_interactions[user_id] for user_id in new_rows['user_id']],
+        dtype=np.intp
+    )
+    timestamps = _timestamps_ns(new_rows['timestamp'])
+    positions = len(base) + len(delta) - n_new + np.arange(n_new)
+    by_group = np.lexsort((positions, -timestamps, groups))
+    groups, timestamps, positions = groups[by_group], timestamps[by_group], positions[by_group]
+    
+    # Only the affected groups are read: each new row goes after the rows
+    # at least as recent, as the stable sort in _user_interaction_index does
+    affected, starts = np.unique(groups, return_index=True)
+    segments = [order[offsets[group]:offsets[group + 1]] for group in affected]
+    existing = _timestamps_ns(_take_rows(
+        base['timestamp'], delta['timestamp'], np.concatenate(segments + [order[:0]])
+    ))
+    slots = np.empty(n_new, dtype=np.intp)
+    ends = np.append(starts[1:], n_new)
+    segment_start = 0
+    for group, segment, start, end in zip(affected, segments, starts, ends):
+        recent = existing[segment_start:segment_start + len(segment)]
+        segment_start += len(segment)
+        slots[start:end] = offsets[group] + np.searchsorted(
+            -recent, -timestamps[start:end], side='right'
+        )
+    
+    order = np.insert(order, slots, positions)
+    offsets = offsets + np.concatenate(
+        ([0], np.cumsum(np.bincount(groups, minlength=n_groups)))
+    )
+    return order, offsets, user_to_interactions
+
+def _popularity_rankings(products_df):
+    """Product rows by (rating, num_reviews) descending, overall and per category"""
+    rating = products_df['rating'].to_numpy()
+    reviews = products_df['num_reviews'].to_numpy()
+    
+    # lexsort is stable, so ties keep catalogue order as sort_values did
+    popular_order = np.lexsort((-reviews, -rating))
+    categories = products_df['category'].to_numpy()[popular_order]
+    category_orders = {
+        category: popular_order[categories == category]
+        for category in pd.unique(categories)
+    }
+    return popular_order, category_orders
+
+def _product_records(products_df):
+    """Catalogue rows as plain dicts, ready to serialise"""
+    return products_df[list(DATA_DTYPES['products'])].to_dict('records')
+
+def _product_attributes(products_df):
+    """Per-row attribute arrays used by the re-ranker's masks and boosts"""
+    return {
+        'category': products_df['category'].to_numpy(),
+        'price': products_df['price'].to_numpy(dtype=np.float64),
+        'discount': products_df['discount'].to_numpy(dtype=np.float64),
+        'stock': products_df['stock'].to_numpy(dtype=np.int64)
+    }
+
+def _ranks_ahead(a, b, rating, reviews):
+    """True if product row a ranks ahead of product row b"""
+    if rating[a] != rating[b]:
+        return rating[a] > rating[b]
+    if reviews[a] != reviews[b]:
+        return reviews[a] > reviews[b]
+    return a < b
+
+def _rerank(order, rows, rating, reviews):
+    """Move rows to their ranked positions in order by binary search"""
+    order = order[~np.isin(order, rows)]
+    for row in rows:
+        low, high = 0, len(order)
+        while low < high:
+            mid = (low + high) // 2
+            if _ranks_ahead(order[mid], row, rating, reviews):
+                low = mid + 1
+            else:
+                high = mid
+        order = np.insert(order, low, row)
+    return order
+
+def _catalogue_fingerprint(product_ids):
+    """Hash of the catalogue's product ids in row order"""
+    return hashlib.sha1('\n'.join(product_ids).encode()).hexdigest()
+
+def _csr_arrays(name, matrix):
+    """Split a CSR matrix into named component arrays"""
+    return {
+        f'{name}_data': matrix.data,
+        f'{name}_indices': matrix.indices,
+        f'{name}_indptr': matrix.indptr
+    }
+
+def _csr_from_arrays(name, arrays, shape):
+    """Rebuild a CSR matrix from component arrays without copying"""
+    return csr_matrix(
+        (arrays[f'{name}_data'], arrays[f'{name}_indices'], arrays[f'{name}_indptr']),
+        shape=tuple(shape),
+        copy=False
+    )
+
+def _read_manifest(model_dir):
+    """The model directory's manifest, or None if nothing was saved there"""
+    try:
+        with open(os.path.join(model_dir, 'manifest.json')) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def _new_array_set(model_dir, created):
+    """Fresh directory for one saved set of arrays, named by creation time"""
+    os.makedirs(model_dir, exist_ok=True)
+    arrays_dir = tempfile.mkdtemp(prefix=created.strftime('v%Y%m%dT%H%M%S-'), dir=model_dir)
+    os.chmod(arrays_dir, 0o755)
+    return arrays_dir
+
+def _publish_array_set(model_dir, manifest):
+    """Atomically point the manifest at manifest['arrays_dir'] and prune old sets"""
+    # Write the manifest last so a partial save is never loadable
+    manifest_path = os.path.join(model_dir, 'manifest.json')
+    previous = _read_manifest(model_dir)
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    
+    kept = [manifest['arrays_dir']]
+    if previous is not None and previous.get('arrays_dir'):
+        kept.append(previous['arrays_dir'])
+    _prune_array_sets(model_dir, kept[:MODEL_VERSIONS_KEPT])
+
+def _prune_array_sets(model_dir, kept):
+    """Remove saved array directories other than the kept ones"""
+    for name in os.listdir(model_dir):
+        path = os.path.join(model_dir, name)
+        saved_set = name.startswith('v') and name[1:9].isdigit() and os.path.isdir(path)
+        if saved_set and name not in kept:
+            # Mapped files may still be open elsewhere (e.g. on Windows)
+            shutil.rmtree(path, ignore_errors=True)
 
 class FlipkartRecommendationEngine:
     """Product recommendation engine with multiple algorithms"""
     
-    def __init__(self):
+    def __init__(self, content_top_k=50, content_block_size=1024,
+                 content_block_bytes=CONTENT_BLOCK_BYTES, neighbor_backend='brute',
+                 neighbor_params=None, als_params=None,
+                 item_top_k=50, item_block_size=1024, hybrid_weights=(0.7, 0.3),
+                 hybrid_history=5, hybrid_decay=0.7, rerank_rules=None, data_dir='data'):
+        self.data_dir = data_dir
         self.products_df = None
+        self.product_ids = None
+        self.product_to_idx = {}
+        self.product_records = []
+        self.product_attributes = {}
+        self.facet_index = None
+        self.popular_order = None
+        self.category_orders = {}
         self.users_df = None
         self.interactions_df = None
+        self.interaction_delta = None
+        self.unsaved_ingests = 0
+        self.user_interaction_order = None
+        self.user_interaction_offsets = None
+        self.user_to_interactions = {}
+        self.interaction_product_codes = None
+        self.interaction_products = None
         self.user_item_matrix = None
-        self.content_similarity = None
+        self.matrix_user_ids = None
+        self.matrix_product_ids = None
+        self.user_to_row = {}
+        self.product_to_col = {}
+        self.content_top_k = content_top_k
+        self.content_block_size = content_block_size
+        self.content_block_bytes = content_block_bytes
+        self.tfidf_vectorizer = None
+        self.tfidf_matrix = None
+        self.content_neighbors = None
+        self.content_scores = None
+        self.neighbor_backend = neighbor_backend
+        self.neighbor_params = neighbor_params or {}
         self.knn_model = None
+        self.als_params = als_params or {}
+        self.als_model = None
+        self.als_user_ids = None
+        self.user_to_als_row = {}
+        self.als_interactions = None
+        self.item_top_k = item_top_k
+        self.item_block_size = item_block_size
+        self.item_neighbors = None
+        self.item_scores = None
+        self.hybrid_weights = hybrid_weights
+        self.hybrid_history = hybrid_history
+        self.hybrid_decay = hybrid_decay
+        self.rerank_rules = {**RERANK_RULES, **(rerank_rules or {})}
+        
+        # Bumped whenever trained state is replaced (train, load, ingest)
+        self.model_version = 0
+        self.training_report = {}
+        self._ingest_lock = threading.Lock()
+        
+        # Format to read the interactions table in on first use, if deferred
+        self._interactions_source = None
+        self._interactions_lock = threading.Lock()
+        
+    def __getattr__(self, name):
+        """Read deferred interaction state on first use"""
+        if name in INTERACTION_STATE and self.__dict__.get('_interactions_source'):
+            self._load_interactions()
+            return self.__dict__[name]
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+        
+    def load_data(self, data_format=None):
+        """Load datasets from CSV, Parquet or Feather files"""
+        data_format = data_format or self._detect_data_format()
+        
+        self._load_catalogue(data_format)
+        self.interactions_df = self._read_table('interactions', data_format)
+        self._interactions_source = None
+        self._build_user_interaction_index()
+        print(f"✅ Data loaded successfully ({data_format})")
+        
+    def load_catalogue(self, data_format=None):
+        """Load products and users; interactions are read on first use"""
+        data_format = data_format or self._detect_data_format()
+        
+        self._load_catalogue(data_format)
+        self._defer_interactions(data_format, INTERACTION_STATE)
+        print(f"✅ Catalogue loaded successfully ({data_format})")
+        
+    def _load_catalogue(self, data_format):
+        """Read products and users and build the catalogue lookups"""
+        self.products_df = self._read_table('products', data_format)
+        self.users_df = self._read_table('users', data_format)
+        self.interaction_delta = _empty_delta()
+        self.unsaved_ingests = 0
+        self.product_ids = self.products_df['product_id'].to_numpy(dtype=str)
+        self.product_to_idx = {
+            product_id: idx for idx, product_id in enumerate(self.product_ids)
+        }
+        self.product_records = _product_records(self.products_df)
+        self.product_attributes = _product_attributes(self.products_df)
+        self.facet_index = FacetIndex(self.products_df)
+        self.popular_order, self.category_orders = _popularity_rankings(self.products_df)
+        
+    def _defer_interactions(self, data_format, names):
+        """Drop interaction state so __getattr__ reads it on first use"""
+        for name in names:
+            self.__dict__.pop(name, None)
+        self._interactions_source = data_format
+        
+    def _load_interactions(self):
+        """Read the deferred interactions table and whatever was derived from it"""
+        with self._interactions_lock:
+            data_format = self._interactions_source
+            if not data_format:
+                return  # Another thread got here first
+            
+            interactions_df = self._read_table('interactions', data_format)
+            state = {'interactions_df': interactions_df}
+            if 'user_interaction_order' in self.__dict__:
+                # The index came with the models; its row positions must still hold
+                if len(interactions_df) != len(self.interaction_product_codes):
+                    raise ValueError(
+                        f"Models were saved with {len(self.interaction_product_codes)} "
+                        f"interactions but {self.data_dir} has {len(interactions_df)}; "
+                        "retrain the models"
+                    )
+            else:
+                state.update(self._interaction_index_state(interactions_df))
+            
+            self.__dict__.update(state)
+            self._interactions_source = None
+        
+    def _detect_data_format(self):
+        """Prefer columnar files when they exist in data_dir"""
+        for data_format in ('parquet', 'feather'):
+            extension = DATA_FORMATS[data_format]
+            if os.path.exists(os.path.join(self.data_dir, f'interactions{extension}')):
+                return data_format
+        return 'csv'
         
-    def load_data(self):
-        """Load datasets"""
-        self.products_df = pd.read_csv('data/products.csv')
-        self.users_df = pd.read_csv('data/users.csv')
-        self.interactions_df = pd.read_csv('data/interactions.csv')
-        print("✅ Data loaded successfully")
+    def _read_table(self, name, data_format):
+        """Read one dataset with explicit dtypes"""
+        path = os.path.join(self.data_dir, f'{name}{DATA_FORMATS[data_format]}')
+        dtypes = DATA_DTYPES[name]
+        
+        if data_format == 'csv':
+            dates = [col for col, dtype in dtypes.items() if dtype == 'datetime64[ns]']
+            df = pd.read_csv(
+                path,
+                dtype={col: dtype for col, dtype in dtypes.items() if col not in dates},
+                parse_dates=dates
+            )
+        elif data_format == 'parquet':
+            df = pd.read_parquet(path)
+        elif data_format == 'feather':
+            df = pd.read_feather(path)
+        else:
+            raise ValueError(f"Unknown data format '{data_format}'")
+        
+        # Columnar files keep their dtypes; this only fixes up older files
+        return df.astype(dtypes)
+        
+    def save_data(self, data_format='parquet'):
+        """Write the loaded (and ingested) datasets to data_dir in a columnar format"""
+        with self._ingest_lock:
+            if len(self.interaction_delta):
+                self.__dict__.update(self._compacted(self.interactions_df, self.interaction_delta))
+            
+            tables = {
+                'products': self.products_df,
+                'users': self.users_df,
+                'interactions': self.interactions_df
+            }
+            for name, df in tables.items():
+                path = os.path.join(self.data_dir, f'{name}{DATA_FORMATS[data_format]}')
+                df = df[list(DATA_DTYPES[name])]
+                if data_format == 'parquet':
+                    df.to_parquet(path, index=False)
+                elif data_format == 'feather':
+                    df.to_feather(path)
+                else:
+                    raise ValueError(f"Unknown columnar format '{data_format}'")
+            self.unsaved_ingests = 0
+        
+        print(f"✅ Data saved as {data_format} in {self.data_dir}")
+        
+    def _compacted(self, interactions_df, delta):
+        """State with delta appended to interactions_df; row positions are unchanged"""
+        interactions_df = pd.concat(
+            [interactions_df, delta],
+            ignore_index=True
+        ).astype(DATA_DTYPES['interactions'])
+        codes, products = _interaction_products(interactions_df)
+        return {
+            'interactions_df': interactions_df,
+            'interaction_delta': delta.iloc[:0],
+            'interaction_product_codes': codes,
+            'interaction_products': products
+        }
+        
+    def _build_user_interaction_index(self):
+        """Group interaction rows by user, most recent first"""
+        self.__dict__.update(self._interaction_index_state(self.interactions_df))
+        
+    def _interaction_index_state(self, interactions_df):
+        """Per-user recency index and product codes of an interactions table"""
+        order, offsets, user_to_interactions = _user_interaction_index(interactions_df)
+        codes, products = _interaction_products(interactions_df)
+        return {
+            'user_interaction_order': order,
+            'user_interaction_offsets': offsets,
+            'user_to_interactions': user_to_interactions,
+            'interaction_product_codes': codes,
+            'interaction_products': products
+        }
         
     def prepare_user_item_matrix(self):
-        """Create user-item interaction matrix"""
-        # Filter only purchases and ratings
-        purchase_data = self.interactions_df[
-            self.interactions_df['interaction_type'].isin(['purchase', 'cart'])
-        ].copy()
-        
-        # Create implicit ratings (purchase=5, cart=3, view=1)
-        purchase_data['implicit_rating'] = purchase_data['interaction_type'].map({
-            'purchase': 5,
-            'cart': 3,
-            'view': 1
-        })
+        """Create sparse user-item interaction matrix"""
+        purchase_data = interaction_ratings(self.interactions_df)
         
-        # Use explicit rating if available, otherwise implicit
-        purchase_data['final_rating'] = purchase_data['rating'].fillna(
-            purchase_data['implicit_rating']
+        # Integer-code ids; sorted codes keep the row/column order of a pivot
+        user_codes, self.matrix_user_ids = pd.factorize(
+            purchase_data['user_id'], sort=True
         )
-        
-        # Create pivot table
-        self.user_item_matrix = purchase_data.pivot_table(
-            index='user_id',
-            columns='product_id',
-            values='final_rating',
-            fill_value=0
+        product_codes, self.matrix_product_ids = pd.factorize(
+            purchase_data['product_id'], sort=True
         )
+        self.matrix_product_ids = np.asarray(self.matrix_product_ids, dtype=str)
+        self._build_matrix_lookups()
+        
+        # Average repeated user/product pairs, as pivot_table did
+        ratings = purchase_data['final_rating'].groupby(
+            [user_codes, product_codes]
+        ).mean()
+        
+        self.user_item_matrix = coo_matrix(
+            (
+                ratings.values.astype(np.float64),
+                (
+                    ratings.index.get_level_values(0).values,
+                    ratings.index.get_level_values(1).values
+                )
+            ),
+            shape=(len(self.matrix_user_ids), len(self.matrix_product_ids))
+        ).tocsr()
+        self.user_item_matrix.sort_indices()
         
         print(f"✅ User-item matrix created: {self.user_item_matrix.shape}")
         
+    def _build_matrix_lookups(self):
+        """Map user/product ids to user-item matrix rows/columns"""
+        self.user_to_row = {
+            user_id: row for row, user_id in enumerate(self.matrix_user_ids)
+        }
+        self.product_to_col = {
+            product_id: col for col, product_id in enumerate(self.matrix_product_ids)
+        }
+        
     def build_collaborative_filtering(self):
         """Build collaborative filtering model using KNN"""
-        # Convert to sparse matrix for efficiency
-        sparse_matrix = csr_matrix(self.user_item_matrix.values)
-        
-        # Train KNN model
-        self.knn_model = NearestNeighbors(
-            metric='cosine',
-            algorithm='brute',
-            n_neighbors=20
+        # Train KNN model with the configured neighbour backend
+        self.knn_model = make_neighbors(
+            self.neighbor_backend,
+            n_neighbors=20,
+            **self.neighbor_params
         )
-        self.knn_model.fit(sparse_matrix)
+        self.knn_model.fit(self.user_item_matrix)
         
         print("✅ Collaborative filtering model built")
         
-    def build_content_based_filtering(self):
+    def build_item_similarity(self):
+        """Precompute the top-K co-interacted products per product"""
+        # Cosine between product columns of the user-item matrix
+        matrix = self.user_item_matrix
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0))).ravel()
+        inverse = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+        items = (matrix @ diags(inverse)).T.tocsr()
+        items_t = items.T.tocsc()
+        
+        # Matrix columns map to catalogue rows (-1 if not in the catalogue)
+        col_to_row = np.array(
+            [self.product_to_idx.get(product_id, -1) for product_id in self.matrix_product_ids],
+            dtype=np.int64
+        )
+        n_cols = items.shape[0]
+        k = min(self.item_top_k, max(n_cols - 1, 1))
+        neighbors = np.full((len(self.product_ids), k), -1, dtype=np.int32)
+        scores = np.zeros((len(self.product_ids), k), dtype=np.float32)
+        
+        for start in range(0, n_cols, self.item_block_size):
+            end = min(start + self.item_block_size, n_cols)
+            block = (items[start:end] @ items_t).tocsr()
+            
+            # A product is never its own neighbour
+            rows = np.repeat(np.arange(end - start), np.diff(block.indptr))
+            block.data[block.indices == rows + start] = 0
+            block.eliminate_zeros()
+            
+            top, top_scores = _top_k_sparse_rows(block, k)
+            targets = col_to_row[start:end]
+            valid = targets >= 0
+            neighbors[targets[valid]] = np.where(top >= 0, col_to_row[top], -1)[valid]
+            scores[targets[valid]] = top_scores[valid]
+        
+        self.item_neighbors, self.item_scores = neighbors, scores
+        print("✅ Item similarity index built")
+        
+    def build_matrix_factorization(self, workers=1):
+        """Build the implicit ALS model from view/cart/purchase weights"""
+        weights = implicit_weights(self.interactions_df)
+        cols = pd.Index(self.product_ids).get_indexer(weights['product_id'])
+        weights = weights[cols >= 0]
+        
+        # Rows are every user with an interaction; columns are catalogue rows
+        user_codes, self.als_user_ids = pd.factorize(weights['user_id'], sort=True)
+        self.als_user_ids = np.asarray(self.als_user_ids, dtype=str)
+        self.user_to_als_row = {
+            user_id: row for row, user_id in enumerate(self.als_user_ids)
+        }
+        self.als_interactions = coo_matrix(
+            (weights['weight'].to_numpy(), (user_codes, cols[cols >= 0])),
+            shape=(len(self.als_user_ids), len(self.product_ids))
+        ).tocsr()
+        
+        self.als_model = ImplicitALS(**self.als_params).fit(
+            self.als_interactions, workers=workers
+        )
+        
+        print("✅ Matrix factorization model built")
+        
+    def build_content_based_filtering(self, workers=1):
         """Build content-based filtering using product features"""
         # Create product feature text
-        self.products_df['features'] = (
-            self.products_df['category'] + ' ' +
-            self.products_df['brand'] + ' ' +
-            self.products_df['product_name']
-        )
+        self.products_df['features'] = _product_features(self.products_df)
         
         # Create TF-IDF vectors
-        tfidf = TfidfVectorizer(stop_words='english')
-        tfidf_matrix = tfidf.fit_transform(self.products_df['features'])
+        self.tfidf_vectorizer = TfidfVectorizer(stop_words='english')
+        self.tfidf_matrix = self.tfidf_vectorizer.fit_transform(self.products_df['features'])
         
-        # Calculate similarity
-        self.content_similarity = cosine_similarity(tfidf_matrix, tfidf_matrix)
+        # Keep only the top-K most similar products per product
+        self.content_neighbors, self.content_scores = self._build_content_index(
+            self.tfidf_matrix, workers=workers
+        )
         
         print("✅ Content-based filtering model built")
         
-    def get_collaborative_recommendations(self, user_id, n_recommendations=10):
-        """Get recommendations using collaborative filtering"""
-        if user_id not in self.user_item_matrix.index:
+    def _content_block_rows(self, n_columns):
+        """Rows per dense content block, capped so one block fits content_block_bytes"""
+        budget_rows = self.content_block_bytes // (n_columns * CONTENT_CELL_BYTES)
+        return int(max(1, min(self.content_block_size, budget_rows)))
+        
+    def _build_content_index(self, tfidf_matrix, start_row=0, workers=1):
+        """Compute top-K content neighbours in row blocks, optionally in parallel"""
+        n_products = tfidf_matrix.shape[0]
+        k = min(self.content_top_k, n_products - 1)
+        neighbors = np.empty((n_products - start_row, k), dtype=np.int32)
+        scores = np.empty((n_products - start_row, k), dtype=np.float32)
+        
+        block_rows = self._content_block_rows(n_products)
+        blocks = [
+            (start, min(start + block_rows, n_products), k)
+            for start in range(start_row, n_products, block_rows)
+        ]
+        if workers > 1 and len(blocks) > 1 and n_products >= PARALLEL_CONTENT_MIN_PRODUCTS:
+            # Spawned (not forked) workers: training may be running other
+            # threads; each worker receives the TF-IDF matrix once
+            with ProcessPoolExecutor(
+                min(workers, len(blocks)),
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_content_worker,
+                initargs=(tfidf_matrix,)
+            ) as pool:
+                results = list(pool.map(_worker_content_block, blocks))
+        else:
+            tfidf_t = tfidf_matrix.T.tocsc()
+            results = (
+                (start, _content_block(tfidf_matrix, tfidf_t, start, end, k))
+                for start, end, k in blocks
+            )
+        
+        for start, (top, top_scores) in results:
+            rows = slice(start - start_row, start - start_row + len(top))
+            neighbors[rows] = top
+            scores[rows] = top_scores
+        
+        return neighbors, scores
+        
+    def _extend_content_index(self, tfidf_matrix, n_old):
+        """Add rows for new products and merge them into existing top-K lists"""
+        k = min(self.content_top_k, tfidf_matrix.shape[0] - 1)
+        if k != self.content_neighbors.shape[1]:
+            # The catalogue was smaller than K; rebuild the whole index
+            return self._build_content_index(tfidf_matrix)
+        
+        new_neighbors, new_scores = self._build_content_index(tfidf_matrix, n_old)
+        neighbors = np.vstack([self.content_neighbors, new_neighbors])
+        scores = np.vstack([self.content_scores, new_scores])
+        
+        # Existing products only change where a new product beats their K-th score
+        new_rows_t = tfidf_matrix[n_old:].T.tocsc()
+        new_products = np.arange(n_old, tfidf_matrix.shape[0])
+        block_rows = self._content_block_rows(k + len(new_products))
+        for start in range(0, n_old, block_rows):
+            end = min(start + block_rows, n_old)
+            block = (tfidf_matrix[start:end] @ new_rows_t).toarray()
+            affected = np.flatnonzero(block.max(axis=1) > scores[start:end, -1])
+            if len(affected) == 0:
+                continue
+            
+            rows = affected + start
+            candidates = np.hstack([
+                neighbors[rows],
+                np.broadcast_to(new_products, (len(rows), len(new_products)))
+            ])
+            candidate_scores = np.hstack([scores[rows], block[affected]])
+            neighbors[rows], scores[rows] = _rank_top_k(candidates, candidate_scores, k)
+        
+        return neighbors, scores
+        
+    def get_collaborative_recommendations(self, user_id, n_recommendations=10, method='knn'):
+        """Get recommendations using collaborative filtering (knn or als)"""
+        if method != 'knn':
+            return self.get_collaborative_recommendations_batch(
+                [user_id], n_recommendations, method
+            )[0]
+        if user_id not in self.user_to_row:
             return self.get_popular_products(n_recommendations)
         
         # Get user index
-        user_idx = self.user_item_matrix.index.get_loc(user_id)
+        user_idx = self.user_to_row[user_id]
+        user_row = self.user_item_matrix[user_idx]
         
         # Find similar users
         distances, indices = self.knn_model.kneighbors(
-            self.user_item_matrix.iloc[user_idx].values.reshape(1, -1),
+            user_row,
             n_neighbors=11
         )
         
+        return self._rank_neighbour_products(
+            user_row, indices[0], n_recommendations
+        )
+    
+    def get_collaborative_recommendations_batch(self, user_ids, n_recommendations=10,
+                                                method='knn'):
+        """Get collaborative recommendations for many users at once"""
+        if method not in COLLABORATIVE_METHODS:
+            raise ValueError(
+                f"Unknown collaborative method '{method}', "
+                f"choose from {list(COLLABORATIVE_METHODS)}"
+            )
+        if method == 'als':
+            return self._als_recommendations(user_ids, n_recommendations)
+        if method == 'item':
+            return [
+                self._item_based_recommendations(user_id, n_recommendations)
+                for user_id in user_ids
+            ]
+        
+        results = [None] * len(user_ids)
+        known = [
+            (pos, self.user_to_row[user_id])
+            for pos, user_id in enumerate(user_ids)
+            if user_id in self.user_to_row
+        ]
+        
+        if known:
+            # One multi-row KNN query for every known user
+            user_rows = self.user_item_matrix[[row for _, row in known]]
+            distances, indices = self.knn_model.kneighbors(
+                user_rows,
+                n_neighbors=11
+            )
+            for i, (pos, _) in enumerate(known):
+                results[pos] = self._rank_neighbour_products(
+                    user_rows[i], indices[i], n_recommendations
+                )
+        
+        if len(known) < len(user_ids):
+            popular = self.get_popular_products(n_recommendations)
+            results = [
+                recs if recs is not None else list(popular)
+                for recs in results
+            ]
+        
+        return results
+    
+    def _als_recommendations(self, user_ids, n_recommendations):
+        """Score every product with one factor product per user"""
+        results = [None] * len(user_ids)
+        known = [
+            (pos, self.user_to_als_row[user_id])
+            for pos, user_id in enumerate(user_ids)
+            if user_id in self.user_to_als_row
+        ]
+        
+        if known:
+            rows = [row for _, row in known]
+            scores = self.als_model.score(rows)
+            for i, (pos, row) in enumerate(known):
+                # Never recommend what the user already interacted with
+                seen = self.als_interactions.indices[
+                    self.als_interactions.indptr[row]:self.als_interactions.indptr[row + 1]
+                ]
+                scores[i, seen] = -np.inf
+                top = _top_n(scores[i], n_recommendations)
+                top = top[np.isfinite(scores[i, top])]
+                results[pos] = self.product_ids[top].tolist()
+        
+        if len(known) < len(user_ids):
+            popular = self.get_popular_products(n_recommendations)
+            results = [
+                recs if recs is not None else list(popular)
+                for recs in results
+            ]
+        
+        return results
+    
+    def _item_based_recommendations(self, user_id, n_recommendations):
+        """Sum the item-item neighbour lists of the products a user rated"""
+        row = self.user_to_row.get(user_id)
+        if row is None:
+            return self.get_popular_products(n_recommendations)
+        
+        start, end = self.user_item_matrix.indptr[row], self.user_item_matrix.indptr[row + 1]
+        if start == end:
+            return self.get_popular_products(n_recommendations)
+        items = np.array([
+            self.product_to_idx.get(product_id, -1)
+            for product_id in self.matrix_product_ids[self.user_item_matrix.indices[start:end]]
+        ], dtype=np.int64)
+        ratings = self.user_item_matrix.data[start:end]
+        
+        # Products added by ingest have no neighbour list until retraining
+        indexed = (items >= 0) & (items < len(self.item_neighbors))
+        neighbours = self.item_neighbors[items[indexed]]
+        weights = self.item_scores[items[indexed]] * ratings[indexed, None]
+        valid = neighbours >= 0
+        
+        totals = np.bincount(
+            neighbours[valid], weights=weights[valid], minlength=len(self.product_ids)
+        )
+        seen = items[items >= 0]
+        totals[seen] = 0
+        candidates = np.flatnonzero(totals > 0)
+        rows = candidates[_top_n(totals[candidates], n_recommendations)]
+        
+        # Backfill short lists with popular products the user hasn't rated
+        if len(rows) < n_recommendations:
+            taken = np.concatenate([rows, seen])
+            backfill = self.popular_order[:n_recommendations + len(taken)]
+            backfill = backfill[~np.isin(backfill, taken)]
+            rows = np.concatenate([rows, backfill[:n_recommendations - len(rows)]])
+        return self.product_ids[rows].tolist()
+    
+    def get_also_bought(self, product_id, n_recommendations=10, filters=None):
+        """Products most often co-bought with this one (item-item CF)"""
+        idx = self.product_to_idx.get(product_id)
+        if idx is None or idx >= len(self.item_neighbors):
+            return []
+        
+        neighbours = self.item_neighbors[idx]
+        neighbours = neighbours[neighbours >= 0]
+        mask = self.facet_index.mask(filters)
+        if mask is not None:
+            neighbours = neighbours[mask[neighbours]]
+        return self.product_ids[neighbours[:n_recommendations]].tolist()
+    
+    def _rank_neighbour_products(self, user_row, neighbour_indices, n_recommendations):
+        """Score products rated by a user's neighbours"""
+        candidates, avg_ratings, first_seen = self._neighbour_scores(user_row, neighbour_indices)
+        top = _top_n(avg_ratings, n_recommendations, tiebreak=first_seen)
+        
+        return self.matrix_product_ids[candidates[top]].tolist()
+    
+    def _neighbour_scores(self, user_row, neighbour_indices):
+        """Matrix columns rated by a user's neighbours, with average ratings"""
         # Get products liked by similar users
-        similar_users_indices = indices.flatten()[1:]  # Exclude the user itself
+        similar_users_indices = neighbour_indices[1:]  # Exclude the user itself
+        neighbour_rows = self.user_item_matrix[similar_users_indices]
         
-        # Aggregate ratings from similar users
-        recommendations = {}
-        user_products = set(self.user_item_matrix.columns[
-            self.user_item_matrix.iloc[user_idx] > 0
-        ])
+        # Flatten neighbour ratings in neighbour order, then column order
+        liked = neighbour_rows.data > 0
+        cols = neighbour_rows.indices[liked]
+        ratings = neighbour_rows.data[liked]
         
-        for idx in similar_users_indices:
-            similar_user_products = self.user_item_matrix.iloc[idx]
-            for product_id, rating in similar_user_products.items():
-                if rating > 0 and product_id not in user_products:
-                    if product_id not in recommendations:
-                        recommendations[product_id] = []
-                    recommendations[product_id].append(rating)
-        
-        # Calculate average ratings
-        avg_recommendations = {
-            product: np.mean(ratings)
-            for product, ratings in recommendations.items()
-        }
+        # Aggregate ratings from similar users
+        n_cols = self.user_item_matrix.shape[1]
+        totals = np.bincount(cols, weights=ratings, minlength=n_cols)
+        counts = np.bincount(cols, minlength=n_cols)
         
-        # Sort and get top N
-        top_products = sorted(
-            avg_recommendations.items(),
-            key=lambda x: x[1],
-            reverse=True
-        )[:n_recommendations]
+        # Candidates are products rated by neighbours but unseen by the user
+        candidates, first_seen = np.unique(cols, return_index=True)
+        unseen = ~np.isin(candidates, user_row.indices)
+        candidates = candidates[unseen]
+        first_seen = first_seen[unseen]
         
-        return [prod[0] for prod in top_products]
+        # Average ratings; ties keep the order products were first seen in
+        return candidates, totals[candidates] / counts[candidates], first_seen
     
-    def get_content_based_recommendations(self, product_id, n_recommendations=10):
+    def get_content_based_recommendations(self, product_id, n_recommendations=10,
+                                          filters=None):
         """Get similar products using content-based filtering"""
-        if product_id not in self.products_df['product_id'].values:
+        idx = self.product_to_idx.get(product_id)
+        if idx is None:
             return []
         
-        # Get product index
-        idx = self.products_df[
-            self.products_df['product_id'] == product_id
-        ].index[0]
+        # Neighbours are stored best first
+        mask = self.facet_index.mask(filters)
+        neighbours = self.content_neighbors[idx]
+        if mask is not None:
+            neighbours = neighbours[mask[neighbours]]
+        
+        if n_recommendations <= len(neighbours):
+            product_indices = neighbours[:n_recommendations]
+        else:
+            # Beyond the stored K (or its filtered share), score against the catalogue
+            sim_scores = (self.tfidf_matrix[idx] @ self.tfidf_matrix.T).toarray().ravel()
+            sim_scores[idx] = -np.inf
+            if mask is not None:
+                sim_scores[~mask] = -np.inf
+            product_indices = _top_n(
+                sim_scores,
+                min(n_recommendations, len(sim_scores) - 1)
+            )
+            product_indices = product_indices[np.isfinite(sim_scores[product_indices])]
         
-        # Get similarity scores
-        sim_scores = list(enumerate(self.content_similarity[idx]))
-        sim_scores = sorted(sim_scores, key=lambda x: x[1], reverse=True)
+        return self.product_ids[product_indices].tolist()
+    
+    def get_content_based_recommendations_batch(self, product_ids, n_recommendations=10,
+                                                filters=None):
+        """Get similar products for many products at once"""
+        if filters or n_recommendations > self.content_neighbors.shape[1]:
+            return [
+                self.get_content_based_recommendations(product_id, n_recommendations, filters)
+                for product_id in product_ids
+            ]
         
-        # Get top N similar products (excluding itself)
-        sim_scores = sim_scores[1:n_recommendations+1]
-        product_indices = [i[0] for i in sim_scores]
+        rows = [self.product_to_idx.get(product_id, -1) for product_id in product_ids]
+        neighbour_ids = self.product_ids[
+            self.content_neighbors[rows, :n_recommendations]
+        ]
         
-        return self.products_df.iloc[product_indices]['product_id'].tolist()
+        return [
+            recs.tolist() if row >= 0 else []
+            for row, recs in zip(rows, neighbour_ids)
+        ]
     
-    def get_hybrid_recommendations(self, user_id, n_recommendations=10):
+    def get_hybrid_recommendations(self, user_id, n_recommendations=10, filters=None):
         """Hybrid approach combining collaborative and content-based"""
-        # Get collaborative recommendations
-        collab_recs = self.get_collaborative_recommendations(user_id, n_recommendations * 2)
+        return self.get_hybrid_recommendations_batch([user_id], n_recommendations, filters)[0]
+    
+    def get_hybrid_recommendations_batch(self, user_ids, n_recommendations=10, filters=None):
+        """Get hybrid recommendations for many users at once"""
+        mask = self.facet_index.mask(filters)
+        popular = _masked(self.popular_order, mask)
+        results = []
+        for sources, exclude, _ in self._candidate_sources(user_ids):
+            candidates, scores, first = self._fuse_scores(sources, exclude, mask)
+            top = _top_n(scores, n_recommendations, tiebreak=first)
+            rows = candidates[top[scores[top] > 0]]
+            
+            # Backfill short lists from the (filtered) popularity ranking
+            if len(rows) < n_recommendations:
+                taken = np.concatenate([rows, exclude])
+                backfill = popular[:n_recommendations + len(taken)]
+                backfill = backfill[~np.isin(backfill, taken)]
+                rows = np.concatenate([rows, backfill[:n_recommendations - len(rows)]])
+            results.append(self.product_ids[rows].tolist())
         
-        if not collab_recs:
-            return self.get_popular_products(n_recommendations)
+        return results
+    
+    def get_ranked_recommendations(self, user_id, n_recommendations=10, filters=None):
+        """Hybrid candidates plus popular backfill, filtered and boosted by business rules"""
+        return self.get_ranked_recommendations_batch([user_id], n_recommendations, filters)[0]
+    
+    def get_ranked_recommendations_batch(self, user_ids, n_recommendations=10, filters=None):
+        """Get ranked recommendations for many users at once"""
+        rules = self.rerank_rules
+        k = rules['candidates']
+        mask = self.facet_index.mask(filters)
+        popular = _masked(self.popular_order, mask)[:k]
+        categories = self.product_attributes['category']
+        
+        results = []
+        for sources, exclude, history in self._candidate_sources(user_ids):
+            # Stage 1: cheap generators, each a few hundred rows scored by rank;
+            # backfill comes from the filtered rankings so lists stay full
+            sources.append((rules['popular_weight'], popular, _rank_scores(len(popular), k)))
+            if len(history):
+                order = _masked(self.category_orders[categories[history[0]]], mask)[:k]
+                sources.append((rules['category_weight'], order, _rank_scores(len(order), k)))
+            candidates, scores, first = self._fuse_scores(sources, exclude, mask)
+            
+            # Stage 2: masks and boosts over the candidate attribute arrays
+            scores = self._apply_business_rules(candidates, scores, history)
+            top = _top_n(scores, n_recommendations, tiebreak=first)
+            top = top[scores[top] > 0]
+            results.append(self.product_ids[candidates[top]].tolist())
         
-        # Get user's recent interactions
-        user_interactions = self.interactions_df[
-            self.interactions_df['user_id'] == user_id
-        ].sort_values('timestamp', ascending=False)
+        return results
+    
+    def _candidate_sources(self, user_ids):
+        """Per user: weighted (rows, scores) sources, rows to exclude, recent products"""
+        known = [
+            (pos, self.user_to_row[user_id])
+            for pos, user_id in enumerate(user_ids)
+            if user_id in self.user_to_row
+        ]
         
-        if len(user_interactions) > 0:
-            recent_product = user_interactions.iloc[0]['product_id']
-            content_recs = self.get_content_based_recommendations(
-                recent_product,
-                n_recommendations
+        # One multi-row KNN query for every user in the user-item matrix
+        neighbours = {}
+        if known:
+            user_rows = self.user_item_matrix[[row for _, row in known]]
+            distances, indices = self.knn_model.kneighbors(
+                user_rows,
+                n_neighbors=11
             )
-        else:
-            content_recs = []
+            for i, (pos, _) in enumerate(known):
+                neighbours[pos] = (user_rows[i], indices[i])
         
-        # Combine recommendations (70% collaborative, 30% content-based)
-        hybrid_recs = []
-        collab_count = int(n_recommendations * 0.7)
-        content_count = n_recommendations - collab_count
+        collab_weight, content_weight = self.hybrid_weights
+        for pos, (history, recency) in enumerate(self._recent_products(user_ids)):
+            sources = []
+            exclude = history
+            if pos in neighbours:
+                user_row, neighbour_indices = neighbours[pos]
+                items, scores, seen = self._collaborative_candidates(user_row, neighbour_indices)
+                sources.append((collab_weight, items, scores))
+                exclude = np.concatenate([seen, history])
+            
+            # Content neighbours of the last K products, decayed by recency
+            sources.append((
+                content_weight,
+                self.content_neighbors[history].ravel(),
+                (self.content_scores[history] * recency[:, None]).ravel()
+            ))
+            yield sources, exclude, history
+    
+    def _collaborative_candidates(self, user_row, neighbour_indices):
+        """Catalogue rows scored by neighbours, in tie-break order, and the user's own rows"""
+        cols, scores, first_seen = self._neighbour_scores(user_row, neighbour_indices)
+        order = np.argsort(first_seen, kind='stable')
+        top = _top_n(scores[order], self.rerank_rules['candidates'])
+        keep = order[np.sort(top)]
         
-        hybrid_recs.extend(collab_recs[:collab_count])
+        items = self._catalogue_rows(self.matrix_product_ids[cols[keep]])
+        seen = self._catalogue_rows(self.matrix_product_ids[user_row.indices])
+        known = items >= 0
+        return items[known], scores[keep][known], seen
+    
+    def _fuse_scores(self, sources, exclude, mask=None):
+        """Blend (weight, rows, scores) sources over their union, each scaled to [0, 1]"""
+        items = np.concatenate([rows for _, rows, _ in sources])
+        if len(items) == 0:
+            return items, np.array([], dtype=np.float64), items
         
-        for rec in content_recs:
-            if rec not in hybrid_recs and len(hybrid_recs) < n_recommendations:
-                hybrid_recs.append(rec)
+        # Sum each source's scores per candidate; ties break by first appearance
+        candidates, first, inverse = np.unique(items, return_index=True, return_inverse=True)
+        fused = np.zeros(len(candidates))
+        offset = 0
+        for weight, rows, scores in sources:
+            totals = np.bincount(
+                inverse[offset:offset + len(rows)],
+                weights=scores,
+                minlength=len(candidates)
+            )
+            offset += len(rows)
+            peak = totals.max()
+            if peak > 0:
+                fused += weight * totals / peak
         
-        # Fill remaining with collaborative
-        for rec in collab_recs:
-            if rec not in hybrid_recs and len(hybrid_recs) < n_recommendations:
-                hybrid_recs.append(rec)
+        # Never recommend what the user already bought or just looked at
+        fused[np.isin(candidates, exclude)] = -np.inf
+        if mask is not None:
+            fused[~mask[candidates]] = -np.inf
+        return candidates, fused, first
+    
+    def _apply_business_rules(self, candidates, scores, history):
+        """Drop out-of-stock candidates and boost discounts and the user's price band"""
+        rules = self.rerank_rules
+        attributes = self.product_attributes
         
-        return hybrid_recs[:n_recommendations]
+        scores = scores * (1 + rules['discount_boost'] * attributes['discount'][candidates] / 100)
+        if len(history) and rules['price_band_boost']:
+            centre = np.median(attributes['price'][history])
+            in_band = np.abs(attributes['price'][candidates] - centre) <= (
+                rules['price_band_width'] * centre
+            )
+            scores[in_band] *= 1 + rules['price_band_boost']
+        if rules['in_stock']:
+            scores[attributes['stock'][candidates] <= 0] = -np.inf
+        
+        return scores
     
-    def get_popular_products(self, n_recommendations=10):
-        """Get popular products as fallback"""
-        popular = self.products_df.sort_values(
-            ['rating', 'num_reviews'],
-            ascending=False
-        ).head(n_recommendations)
+    def _recent_products(self, user_ids):
+        """Per user, catalogue rows of the last K products and their recency weights"""
+        bounds = []
+        for user_id in user_ids:
+            group = self.user_to_interactions.get(user_id)
+            if group is None:
+                bounds.append((0, 0))
+            else:
+                start = self.user_interaction_offsets[group]
+                end = min(self.user_interaction_offsets[group + 1], start + self.hybrid_history)
+                bounds.append((start, end))
         
-        return popular['product_id'].tolist()
+        # Fetch every user's history rows with one take; loaded rows are read
+        # from the product codes, so the interactions table itself is not needed
+        rows = np.concatenate([
+            self.user_interaction_order[start:end] for start, end in bounds
+        ] + [np.array([], dtype=np.intp)])
+        codes = self.interaction_product_codes
+        in_delta = rows >= len(codes)
+        product_ids = np.empty(len(rows), dtype=object)
+        product_ids[~in_delta] = self.interaction_products[codes[rows[~in_delta]]]
+        product_ids[in_delta] = self.interaction_delta['product_id'].to_numpy()[
+            rows[in_delta] - len(codes)
+        ]
+        history = self._catalogue_rows(product_ids)
+        
+        results = []
+        offset = 0
+        for start, end in bounds:
+            items = history[offset:offset + end - start]
+            recency = self.hybrid_decay ** np.arange(len(items), dtype=np.float64)
+            offset += end - start
+            
+            # Interactions with products missing from the catalogue carry no content
+            known = items >= 0
+            results.append((items[known], recency[known]))
+        
+        return results
+    
+    def _catalogue_rows(self, product_ids):
+        """products_df rows for product ids, -1 where unknown"""
+        return np.array(
+            [self.product_to_idx.get(product_id, -1) for product_id in product_ids],
+            dtype=np.int64
+        )
+    
+    def get_user_interactions(self, user_id, n_interactions=None):
+        """Get a user's interactions, most recent first"""
+        group = self.user_to_interactions.get(user_id)
+        if group is None:
+            return self.interactions_df.iloc[:0]
+        
+        start = self.user_interaction_offsets[group]
+        end = self.user_interaction_offsets[group + 1]
+        if n_interactions is not None:
+            end = min(end, start + n_interactions)
+        
+        return _take_rows(
+            self.interactions_df,
+            self.interaction_delta,
+            self.user_interaction_order[start:end]
+        )
     
-    def get_category_recommendations(self, category, n_recommendations=10):
+    def get_popular_products(self, n_recommendations=10, filters=None):
+        """Get popular products as fallback"""
+        order = _masked(self.popular_order, self.facet_index.mask(filters))
+        return self.product_ids[order[:n_recommendations]].tolist()
+    
+    def get_category_recommendations(self, category, n_recommendations=10, filters=None):
         """Get top products in a category"""
-        category_products = self.products_df[
-            self.products_df['category'] == category
-        ].sort_values(['rating', 'num_reviews'], ascending=False)
+        order = self.category_orders.get(category)
+        if order is None:
+            return []
+        
+        order = _masked(order, self.facet_index.mask(filters))
+        return self.product_ids[order[:n_recommendations]].tolist()
+    
+    def get_product_page(self, filters=None, start=0, limit=100):
+        """Catalogue records matching filters from row `start` on, and the next start row"""
+        mask = self.facet_index.mask(filters)
+        if mask is None:
+            rows = np.arange(start, len(self.product_records))
+        else:
+            rows = start + np.flatnonzero(mask[start:])
+        
+        page = rows[:limit]
+        next_start = int(page[-1]) + 1 if len(rows) > limit else None
+        return [self.product_records[row] for row in page], next_start
+    
+    def update_product_ratings(self, updates):
+        """Update product ratings/review counts and re-rank only those products"""
+        if len(updates) == 0:
+            return
         
-        return category_products.head(n_recommendations)['product_id'].tolist()
+        with self._ingest_lock:
+            updates = pd.DataFrame(updates)
+            unknown = [
+                product_id for product_id in updates['product_id']
+                if product_id not in self.product_to_idx
+            ]
+            if unknown:
+                raise ValueError(f"Unknown product ids: {unknown[:10]}")
+            
+            # A product listed twice takes its last update and is re-ranked once
+            updates = updates.drop_duplicates('product_id', keep='last')
+            rows = np.array(
+                [self.product_to_idx[product_id] for product_id in updates['product_id']],
+                dtype=np.intp
+            )
+            
+            products_df = self.products_df.copy()
+            for column in ('rating', 'num_reviews'):
+                if column in updates:
+                    products_df.iloc[rows, products_df.columns.get_loc(column)] = (
+                        updates[column].to_numpy().astype(products_df[column].dtype)
+                    )
+            rating = products_df['rating'].to_numpy()
+            reviews = products_df['num_reviews'].to_numpy()
+            
+            popular_order = _rerank(self.popular_order, rows, rating, reviews)
+            category_orders = dict(self.category_orders)
+            categories = products_df['category'].to_numpy()
+            for category in pd.unique(categories[rows]):
+                changed = rows[categories[rows] == category]
+                category_orders[category] = _rerank(
+                    category_orders[category], changed, rating, reviews
+                )
+            
+            # Rebuild the records of the changed rows only
+            product_records = list(self.product_records)
+            for row, record in zip(rows, _product_records(products_df.iloc[rows])):
+                product_records[row] = record
+            
+            # Only the rating range index depends on the changed columns
+            facet_index = self.facet_index
+            if 'rating' in updates:
+                facet_index = facet_index.with_values('rating', rating)
+            
+            # Swap the new state in with a single dict update
+            self.__dict__.update({
+                'products_df': products_df,
+                'product_records': product_records,
+                'facet_index': facet_index,
+                'popular_order': popular_order,
+                'category_orders': category_orders,
+                'model_version': self.model_version + 1
+            })
     
     def get_product_details(self, product_ids):
-        """Get detailed information for products"""
-        return self.products_df[
-            self.products_df['product_id'].isin(product_ids)
-        ].to_dict('records')
+        """Get detailed information for products, in the order given"""
+        # Read the index first: records are only ever appended to
+        product_to_idx = self.product_to_idx
+        product_records = self.product_records
+        return [
+            product_records[product_to_idx[product_id]]
+            for product_id in product_ids
+            if product_id in product_to_idx
+        ]
     
-    def train(self):
-        """Train all recommendation models"""
+    def train(self, workers=None):
+        """Train all recommendation models, running independent stages concurrently"""
         print("Training recommendation engine...")
-        self.load_data()
-        self.prepare_user_item_matrix()
-        self.build_collaborative_filtering()
-        self.build_content_based_filtering()
-        print("✅ Training complete!")
+        workers = workers or os.cpu_count() or 1
+        started = time.perf_counter()
+        self.training_report = {'workers': workers, 'stages': {}}
+        self._run_stage('load_data', self.load_data)
+        
+        # The KNN, ALS and content models only share the loaded data
+        with ThreadPoolExecutor(max_workers=3 if workers > 1 else 1) as pool:
+            stages = [
+                pool.submit(self._train_collaborative),
+                pool.submit(
+                    self._run_stage, 'als_fit', self.build_matrix_factorization, workers
+                ),
+                pool.submit(
+                    self._run_stage, 'content_model', self.build_content_based_filtering, workers
+                )
+            ]
+            for stage in stages:
+                stage.result()
+        
+        self.training_report['total_s'] = round(time.perf_counter() - started, 3)
+        self.training_report['peak_rss_mb'] = _peak_rss_mb()
+        if resource is not None:
+            self.training_report['worker_peak_rss_mb'] = _peak_rss_mb(resource.RUSAGE_CHILDREN)
+        self.model_version += 1
+        
+        for name, stage in self.training_report['stages'].items():
+            print(f"   {name:<18} {stage['seconds']:>8.3f}s   peak RSS {stage['peak_rss_mb']} MB")
+        print(f"✅ Training complete in {self.training_report['total_s']:.2f}s!")
+        
+    def _train_collaborative(self):
+        """User-item matrix, then the KNN and item similarity models built on it"""
+        self._run_stage('user_item_matrix', self.prepare_user_item_matrix)
+        self._run_stage('knn_fit', self.build_collaborative_filtering)
+        self._run_stage('item_similarity', self.build_item_similarity)
+        
+    def _run_stage(self, name, stage, *args):
+        """Run one training stage, recording its time and the peak RSS so far"""
+        started = time.perf_counter()
+        stage(*args)
+        self.training_report['stages'][name] = {
+            'seconds': round(time.perf_counter() - started, 3),
+            'peak_rss_mb': _peak_rss_mb()
+        }
+        
+    def ingest(self, new_interactions, new_products=None):
+        """Fold new interactions (and products) into the models without retraining"""
+        with self._ingest_lock:
+            state = {}
+            if new_products is not None and len(new_products):
+                new_products = pd.DataFrame(new_products)
+                new_products = new_products[
+                    ~new_products['product_id'].isin(list(self.product_to_idx))
+                ]
+                if len(new_products):
+                    state.update(self._ingest_products(new_products))
+            
+            new_interactions = pd.DataFrame(new_interactions)
+            if len(new_interactions):
+                state.update(self._ingest_interactions(new_interactions))
+            if not state:
+                # Nothing changed, so cached responses are still valid
+                return
+            
+            # Swap the new state in with a single dict update
+            state['model_version'] = self.model_version + 1
+            state['unsaved_ingests'] = self.unsaved_ingests + 1
+            self.__dict__.update(state)
+        
+    def _ingest_products(self, new_products):
+        """Append products and update only the affected content index rows"""
+        new_products = new_products[list(DATA_DTYPES['products'])]
+        products_df = pd.concat(
+            [self.products_df, new_products],
+            ignore_index=True
+        ).astype(DATA_DTYPES['products'])
+        if 'features' in self.products_df:
+            products_df['features'] = _product_features(products_df)
+        
+        # New products are vectorised with the trained vocabulary
+        n_old = self.tfidf_matrix.shape[0]
+        tfidf_matrix = vstack([
+            self.tfidf_matrix,
+            self.tfidf_vectorizer.transform(_product_features(new_products))
+        ]).tocsr()
+        content_neighbors, content_scores = self._extend_content_index(
+            tfidf_matrix, n_old
+        )
+        
+        product_ids = np.concatenate([
+            self.product_ids,
+            new_products['product_id'].to_numpy(dtype=str)
+        ])
+        product_to_idx = dict(self.product_to_idx)
+        product_to_idx.update(
+            (product_id, n_old + i) for i, product_id in enumerate(product_ids[n_old:])
+        )
+        
+        # Slot the new products into the popularity rankings
+        new_rows = np.arange(n_old, len(products_df))
+        rating = products_df['rating'].to_numpy()
+        reviews = products_df['num_reviews'].to_numpy()
+        categories = products_df['category'].to_numpy()
+        popular_order = _rerank(self.popular_order, new_rows, rating, reviews)
+        category_orders = dict(self.category_orders)
+        for category in pd.unique(categories[new_rows]):
+            category_orders[category] = _rerank(
+                category_orders.get(category, np.array([], dtype=np.intp)),
+                new_rows[categories[new_rows] == category],
+                rating,
+                reviews
+            )
+        
+        return {
+            'products_df': products_df,
+            'product_records': self.product_records + _product_records(products_df.iloc[n_old:]),
+            'product_attributes': _product_attributes(products_df),
+            'facet_index': FacetIndex(products_df),
+            'product_ids': product_ids,
+            'product_to_idx': product_to_idx,
+            'popular_order': popular_order,
+            'category_orders': category_orders,
+            'tfidf_matrix': tfidf_matrix,
+            'content_neighbors': content_neighbors,
+            'content_scores': content_scores
+        }
+        
+    def _ingest_interactions(self, new_interactions):
+        """Buffer interactions and rebuild only the affected user rows"""
+        interactions_df, delta = self.interactions_df, self.interaction_delta
+        new_interactions = new_interactions[list(DELTA_DTYPES)].astype(DELTA_DTYPES)
+        start = len(interactions_df) + len(delta)
+        new_interactions.index = pd.RangeIndex(start, start + len(new_interactions))
+        delta = pd.concat([delta, new_interactions]) if len(delta) else new_interactions
+        
+        order, offsets, user_to_interactions = _extend_interaction_index(
+            (
+                self.user_interaction_order,
+                self.user_interaction_offsets,
+                self.user_to_interactions
+            ),
+            interactions_df,
+            delta,
+            len(new_interactions)
+        )
+        state = {
+            'interactions_df': interactions_df,
+            'interaction_delta': delta,
+            'user_interaction_order': order,
+            'user_interaction_offsets': offsets,
+            'user_to_interactions': user_to_interactions
+        }
+        
+        # Compaction copies every row, so it only runs once the buffer is large
+        threshold = max(INTERACTION_DELTA_MIN_ROWS, INTERACTION_DELTA_SHARE * len(interactions_df))
+        if len(delta) >= threshold:
+            state.update(self._compacted(interactions_df, delta))
+        
+        new_ratings = interaction_ratings(new_interactions)
+        if len(new_ratings) == 0:
+            return state
+        
+        # New users and products are appended as new rows/columns
+        matrix_user_ids = np.asarray(self.matrix_user_ids, dtype=str)
+        matrix_product_ids = np.asarray(self.matrix_product_ids, dtype=str)
+        user_to_row = dict(self.user_to_row)
+        product_to_col = dict(self.product_to_col)
+        added_users = [
+            user_id for user_id in pd.unique(new_ratings['user_id'].astype(str))
+            if user_id not in user_to_row
+        ]
+        added_products = [
+            product_id for product_id in pd.unique(new_ratings['product_id'].astype(str))
+            if product_id not in product_to_col
+        ]
+        user_to_row.update(
+            (user_id, len(matrix_user_ids) + i) for i, user_id in enumerate(added_users)
+        )
+        product_to_col.update(
+            (product_id, len(matrix_product_ids) + i) for i, product_id in enumerate(added_products)
+        )
+        matrix_user_ids = np.concatenate([matrix_user_ids, np.asarray(added_users, dtype=str)])
+        matrix_product_ids = np.concatenate([matrix_product_ids, np.asarray(added_products, dtype=str)])
+        shape = (len(matrix_user_ids), len(matrix_product_ids))
+        
+        # Recompute affected users' rows from their full history
+        affected_users = pd.unique(new_ratings['user_id'].astype(str))
+        positions = np.concatenate([
+            order[offsets[user_to_interactions[user_id]]:offsets[user_to_interactions[user_id] + 1]]
+            for user_id in affected_users
+        ])
+        history = interaction_ratings(_take_rows(interactions_df, delta, positions))
+        ratings = history['final_rating'].groupby([
+            [user_to_row[user_id] for user_id in history['user_id'].astype(str)],
+            [product_to_col[product_id] for product_id in history['product_id'].astype(str)]
+        ]).mean()
+        replacement = coo_matrix(
+            (
+                ratings.values,
+                (
+                    ratings.index.get_level_values(0).values,
+                    ratings.index.get_level_values(1).values
+                )
+            ),
+            shape=shape
+        ).tocsr()
         
-    def save_models(self):
-        """Save trained models"""
-        os.makedirs('models', exist_ok=True)
+        # Grow the old matrix (empty rows for new users), clear affected rows
+        old = self.user_item_matrix
+        indptr = np.concatenate([
+            old.indptr,
+            np.full(shape[0] - old.shape[0], old.indptr[-1], dtype=old.indptr.dtype)
+        ])
+        grown = csr_matrix((old.data, old.indices, indptr), shape=shape)
+        keep = np.ones(shape[0])
+        keep[[user_to_row[user_id] for user_id in affected_users]] = 0
+        user_item_matrix = (diags(keep) @ grown).tocsr()
+        user_item_matrix.eliminate_zeros()
+        user_item_matrix = (user_item_matrix + replacement).tocsr()
+        user_item_matrix.sort_indices()
+        
+        # Only the affected users are re-hashed / re-assigned
+        knn_model = self.knn_model.update(
+            user_item_matrix,
+            [user_to_row[user_id] for user_id in affected_users]
+        )
         
-        joblib.dump(self.knn_model, 'models/knn_model.pkl')
-        joblib.dump(self.user_item_matrix, 'models/user_item_matrix.pkl')
-        joblib.dump(self.content_similarity, 'models/content_similarity.pkl')
+        state.update({
+            'matrix_user_ids': matrix_user_ids,
+            'matrix_product_ids': matrix_product_ids,
+            'user_to_row': user_to_row,
+            'product_to_col': product_to_col,
+            'user_item_matrix': user_item_matrix,
+            'knn_model': knn_model
+        })
+        return state
+        
+    def save_models(self, model_dir='models'):
+        """Save trained models as a new set of raw .npy arrays plus a manifest"""
+        # load_models() reads data_dir, which must hold the ingested rows too
+        if self.unsaved_ingests:
+            raise ValueError(
+                f"{self.unsaved_ingests} ingest(s) are not in {self.data_dir}; "
+                "call save_data() before save_models()"
+            )
+        arrays = {
+            'matrix_user_ids': np.asarray(self.matrix_user_ids, dtype=str),
+            'matrix_product_ids': np.asarray(self.matrix_product_ids, dtype=str),
+            'content_neighbors': self.content_neighbors,
+            'content_scores': self.content_scores,
+            'tfidf_vocabulary': self.tfidf_vectorizer.get_feature_names_out().astype(str),
+            'tfidf_idf': self.tfidf_vectorizer.idf_,
+            'als_user_ids': self.als_user_ids,
+            'item_neighbors': self.item_neighbors,
+            'item_scores': self.item_scores,
+            'interaction_order': self.user_interaction_order,
+            'interaction_offsets': self.user_interaction_offsets,
+            'interaction_user_ids': np.asarray(list(self.user_to_interactions), dtype=str),
+            'interaction_product_codes': self.interaction_product_codes,
+            'interaction_products': self.interaction_products
+        }
+        arrays.update(_csr_arrays('user_item', self.user_item_matrix))
+        arrays.update(_csr_arrays('tfidf', self.tfidf_matrix))
+        arrays.update(_csr_arrays('als_interactions', self.als_interactions))
+        arrays.update({
+            f'als_{name}': array
+            for name, array in self.als_model.get_state().items()
+        })
+        arrays.update({
+            f'knn_{name}': array
+            for name, array in self.knn_model.get_state().items()
+        })
+        
+        # Running workers mmap the current arrays, so never write over them:
+        # each save gets a fresh directory that the manifest switches to
+        created = datetime.now()
+        arrays_dir = _new_array_set(model_dir, created)
+        for name, array in arrays.items():
+            np.save(os.path.join(arrays_dir, f'{name}.npy'), array)
+        
+        manifest = {
+            'format_version': MODEL_FORMAT_VERSION,
+            'created': created.isoformat(timespec='seconds'),
+            'arrays_dir': os.path.basename(arrays_dir),
+            'arrays': sorted(arrays),
+            'user_item_shape': list(self.user_item_matrix.shape),
+            'tfidf_shape': list(self.tfidf_matrix.shape),
+            'neighbor_backend': self.neighbor_backend,
+            'neighbor_params': self.neighbor_params,
+            'als_interactions_shape': list(self.als_interactions.shape),
+            'als_params': self.als_params,
+            'n_products': len(self.product_ids),
+            'catalogue_sha1': _catalogue_fingerprint(self.product_ids),
+            'n_interactions': len(self.interaction_product_codes)
+        }
+        
+        _publish_array_set(model_dir, manifest)
         
         print("✅ Models saved")
         
-    def load_models(self):
-        """Load trained models"""
-        self.load_data()
-        self.knn_model = joblib.load('models/knn_model.pkl')
-        self.user_item_matrix = joblib.load('models/user_item_matrix.pkl')
-        self.content_similarity = joblib.load('models/content_similarity.pkl')
+    def load_models(self, model_dir='models'):
+        """Load trained models, memory-mapping the saved arrays"""
+        manifest = _read_manifest(model_dir)
+        if manifest is None:
+            raise FileNotFoundError(f"No saved models in {model_dir}")
+        if manifest['format_version'] != MODEL_FORMAT_VERSION:
+            raise ValueError(
+                f"Model format {manifest['format_version']} is not supported, "
+                f"expected {MODEL_FORMAT_VERSION}; retrain the models"
+            )
+        
+        # The interactions table is read on first use; hybrid scoring and the
+        # per-user index come from the saved arrays
+        data_format = self._detect_data_format()
+        self._load_catalogue(data_format)
+        
+        # Content and item indexes are per catalogue row, so rows must line up
+        if (manifest['n_products'] != len(self.product_ids)
+                or manifest['catalogue_sha1'] != _catalogue_fingerprint(self.product_ids)):
+            raise ValueError(
+                f"Models were trained on {manifest['n_products']} products but "
+                f"{self.data_dir} has {len(self.product_ids)} (or a different "
+                "catalogue); retrain the models"
+            )
+        
+        # Read-only mmaps let worker processes share the same pages
+        arrays_dir = os.path.join(model_dir, manifest['arrays_dir'])
+        arrays = {
+            name: np.load(os.path.join(arrays_dir, f'{name}.npy'), mmap_mode='r')
+            for name in manifest['arrays']
+        }
+        
+        self.user_interaction_order = arrays['interaction_order']
+        self.user_interaction_offsets = arrays['interaction_offsets']
+        self.user_to_interactions = {
+            user_id: group for group, user_id in enumerate(arrays['interaction_user_ids'])
+        }
+        self.interaction_product_codes = arrays['interaction_product_codes']
+        self.interaction_products = arrays['interaction_products']
+        self._defer_interactions(data_format, ['interactions_df'])
+        
+        self.matrix_user_ids = arrays['matrix_user_ids']
+        self.matrix_product_ids = arrays['matrix_product_ids']
+        self._build_matrix_lookups()
+        self.user_item_matrix = _csr_from_arrays(
+            'user_item', arrays, manifest['user_item_shape']
+        )
+        self.tfidf_matrix = _csr_from_arrays('tfidf', arrays, manifest['tfidf_shape'])
+        self.tfidf_vectorizer = TfidfVectorizer(
+            stop_words='english',
+            vocabulary=arrays['tfidf_vocabulary'].tolist()
+        )
+        self.tfidf_vectorizer.idf_ = np.asarray(arrays['tfidf_idf'])
+        self.content_neighbors = arrays['content_neighbors']
+        self.content_scores = arrays['content_scores']
+        self.item_neighbors = arrays['item_neighbors']
+        self.item_scores = arrays['item_scores']
+        
+        self.neighbor_backend = manifest['neighbor_backend']
+        self.neighbor_params = manifest['neighbor_params']
+        self.knn_model = make_neighbors(
+            self.neighbor_backend,
+            n_neighbors=20,
+            **self.neighbor_params
+        ).set_state(
+            {
+                name[len('knn_'):]: array
+                for name, array in arrays.items()
+                if name.startswith('knn_')
+            },
+            self.user_item_matrix
+        )
+        
+        self.als_params = manifest['als_params']
+        self.als_user_ids = arrays['als_user_ids']
+        self.user_to_als_row = {
+            user_id: row for row, user_id in enumerate(self.als_user_ids)
+        }
+        self.als_interactions = _csr_from_arrays(
+            'als_interactions', arrays, manifest['als_interactions_shape']
+        )
+        self.als_model = ImplicitALS(**self.als_params).set_state({
+            'user_factors': arrays['als_user_factors'],
+            'item_factors': arrays['als_item_factors']
+        })
         
+        self.model_version += 1
         print("✅ Models loaded")
 
 if __name__ == "__main__":
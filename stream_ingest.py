@@ -0,0 +1,309 @@
+"""
+Streaming ingestion of clickstream interactions into a live engine.
+
+Events use the data/interactions.csv schema (user_id, product_id,
+interaction_type, rating, timestamp). A source generator (file tail or a
+local TCP socket of newline-delimited JSON) feeds a bounded queue; a
+consumer dedupes, micro-batches by size or time and hands each batch to
+engine.ingest(). Sources yield None while idle so time-based flushes
+still happen when traffic stops.
+"""
+import csv
+import json
+import queue
+import re
+import socket
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+from recommendation_engine import IMPLICIT_RATINGS, interaction_ratings
+
+EVENT_FIELDS = ['user_id', 'product_id', 'interaction_type', 'rating', 'timestamp']
+
+# Text read as epoch seconds; shorter digit runs (e.g. '20250101') are dates
+EPOCH_PATTERN = re.compile(r'\d{9,}(\.\d+)?')
+
+def tail_file(path, poll_interval=0.5, from_start=False, stop_event=None):
+    """Yield events appended to a CSV file (header row required)"""
+    with open(path, newline='') as f:
+        header = next(csv.reader([f.readline()]))
+        if not from_start:
+            f.seek(0, 2)
+        
+        pending = ''
+        while stop_event is None or not stop_event.is_set():
+            line = f.readline()
+            if not line:
+                yield None
+                time.sleep(poll_interval)
+                continue
+            
+            # Keep partial lines until the writer finishes them
+            pending += line
+            if not pending.endswith('\n'):
+                continue
+            row = next(csv.reader([pending]))
+            pending = ''
+            if row:
+                yield dict(zip(header, row))
+
+def socket_events(host='127.0.0.1', port=9099, poll_interval=0.5, stop_event=None):
+    """Yield newline-delimited JSON events sent to a local TCP socket"""
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind((host, port))
+    server.listen(1)
+    server.settimeout(poll_interval)
+    
+    try:
+        while stop_event is None or not stop_event.is_set():
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                yield None
+                continue
+            
+            conn.settimeout(poll_interval)
+            buffer = b''
+            with conn:
+                while stop_event is None or not stop_event.is_set():
+                    try:
+                        chunk = conn.recv(65536)
+                    except socket.timeout:
+                        yield None
+                        continue
+                    if not chunk:
+                        break
+                    
+                    buffer += chunk
+                    *lines, buffer = buffer.split(b'\n')
+                    for line in lines:
+                        if not line.strip():
+                            continue
+                        # Malformed lines are passed on for clean_event to reject
+                        try:
+                            yield json.loads(line)
+                        except (json.JSONDecodeError, UnicodeDecodeError):
+                            yield line
+    finally:
+        server.close()
+
+def parse_timestamp(value):
+    """Naive UTC timestamp from a date string or epoch seconds, None if invalid"""
+    try:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            timestamp = pd.Timestamp(value, unit='s')
+        elif isinstance(value, str) and EPOCH_PATTERN.fullmatch(value.strip()):
+            # CSV-tailed events carry epoch seconds as text
+            timestamp = pd.Timestamp(float(value), unit='s')
+        else:
+            timestamp = pd.Timestamp(str(value))
+        if timestamp is pd.NaT:
+            return None
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.tz_convert('UTC').tz_localize(None)
+        
+        # The engine stores datetime64[ns]; later dates do not fit
+        return timestamp.as_unit('ns')
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+def clean_event(event):
+    """Normalise an event, or return None if it is malformed or cannot be rated"""
+    if not isinstance(event, dict):
+        return None
+    if any(event.get(field) in (None, '') for field in EVENT_FIELDS if field != 'rating'):
+        return None
+    if event['interaction_type'] not in IMPLICIT_RATINGS:
+        return None
+    
+    rating = event.get('rating')
+    try:
+        rating = float(rating) if rating not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+    
+    timestamp = parse_timestamp(event['timestamp'])
+    if timestamp is None:
+        return None
+    
+    return {
+        'user_id': str(event['user_id']),
+        'product_id': str(event['product_id']),
+        'interaction_type': event['interaction_type'],
+        'rating': rating,
+        'timestamp': timestamp
+    }
+
+def dedupe(events, window=100000, metrics=None):
+    """Drop repeats of an event seen among the last `window` events"""
+    seen = OrderedDict()
+    for event in events:
+        if event is None:
+            yield None
+            continue
+        
+        key = (event['user_id'], event['product_id'], event['interaction_type'], event['timestamp'])
+        if key in seen:
+            if metrics is not None:
+                metrics['duplicates'] += 1
+            continue
+        
+        seen[key] = None
+        if len(seen) > window:
+            seen.popitem(last=False)
+        yield event
+
+def micro_batches(events, max_size=500, max_wait=1.0):
+    """Group events into lists, flushing on size or after max_wait seconds"""
+    batch = []
+    started = None
+    for event in events:
+        if event is not None:
+            if not batch:
+                started = time.monotonic()
+            batch.append(event)
+        
+        if batch and (len(batch) >= max_size or time.monotonic() - started >= max_wait):
+            yield batch
+            batch = []
+    
+    if batch:
+        yield batch
+
+class StreamIngestor:
+    """Run a source -> dedupe -> micro-batch -> engine.ingest pipeline"""
+    
+    def __init__(self, engine, source, max_batch_size=500, max_batch_wait=1.0,
+                 max_queue_size=10000, dedupe_window=100000, block_when_full=True):
+        self.engine = engine
+        self.source = source
+        self.max_batch_size = max_batch_size
+        self.max_batch_wait = max_batch_wait
+        self.dedupe_window = dedupe_window
+        self.block_when_full = block_when_full
+        
+        # The bounded queue is what keeps memory flat during traffic spikes
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._stop = threading.Event()
+        self._threads = []
+        self._metrics = {
+            'received': 0,
+            'invalid': 0,
+            'duplicates': 0,
+            'dropped': 0,
+            'blocked_s': 0.0,
+            'batches': 0,
+            'ingested': 0,
+            'rated': 0,
+            'errors': 0,
+            'last_error': None,
+            'source_error': None,
+            'max_queue_depth': 0,
+            'last_batch_size': 0,
+            'last_batch_ms': 0.0
+        }
+    
+    def start(self):
+        """Start producer and consumer threads"""
+        for target in (self._produce, self._consume):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+    
+    def stop(self, timeout=5.0):
+        """Stop reading, flush what is queued and wait for the threads"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+    
+    def metrics(self):
+        """Counters plus current queue depth"""
+        metrics = dict(self._metrics)
+        metrics['queue_depth'] = self._queue.qsize()
+        metrics['queue_capacity'] = self._queue.maxsize
+        return metrics
+    
+    def _produce(self):
+        try:
+            self._read_source()
+        except Exception as e:
+            # Surface a dead source in metrics() instead of dying silently
+            self._metrics['source_error'] = f"{type(e).__name__}: {e}"
+            print(f"❌ Interaction stream stopped: {e}")
+        finally:
+            self.source.close()
+    
+    def _read_source(self):
+        # Sources yield None while idle, so stop() is noticed promptly
+        for raw in self.source:
+            if self._stop.is_set():
+                break
+            if raw is None:
+                continue
+            
+            self._metrics['received'] += 1
+            event = clean_event(raw)
+            if event is None:
+                self._metrics['invalid'] += 1
+                continue
+            
+            if self.block_when_full:
+                # Backpressure: stop pulling from the source until there is room
+                started = time.monotonic()
+                while not self._stop.is_set():
+                    try:
+                        self._queue.put(event, timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+                self._metrics['blocked_s'] += time.monotonic() - started
+            else:
+                try:
+                    self._queue.put_nowait(event)
+                except queue.Full:
+                    self._metrics['dropped'] += 1
+                    continue
+            
+            self._metrics['max_queue_depth'] = max(
+                self._metrics['max_queue_depth'], self._queue.qsize()
+            )
+    
+    def _queued_events(self):
+        """Drain the queue, yielding None on idle ticks"""
+        while not self._stop.is_set() or not self._queue.empty():
+            try:
+                yield self._queue.get(timeout=min(self.max_batch_wait, 0.1))
+            except queue.Empty:
+                yield None
+    
+    def _consume(self):
+        events = dedupe(self._queued_events(), self.dedupe_window, self._metrics)
+        for batch in micro_batches(events, self.max_batch_size, self.max_batch_wait):
+            started = time.monotonic()
+            batch_df = pd.DataFrame(batch, columns=EVENT_FIELDS)
+            try:
+                self.engine.ingest(batch_df)
+            except Exception as e:
+                # The batch is lost; keep the cause visible in metrics()
+                self._metrics['errors'] += 1
+                self._metrics['last_error'] = f"{type(e).__name__}: {e}"
+                print(f"❌ Ingesting a batch of {len(batch)} interactions failed: {e}")
+                continue
+            
+            self._metrics['batches'] += 1
+            self._metrics['ingested'] += len(batch)
+            self._metrics['rated'] += len(interaction_ratings(batch_df))
+            self._metrics['last_batch_size'] = len(batch)
+            self._metrics['last_batch_ms'] = round((time.monotonic() - started) * 1000, 2)
+
+def open_source(spec):
+    """Build a source from 'tcp://host:port' or a CSV file path"""
+    if spec.startswith('tcp://'):
+        host, port = spec[len('tcp://'):].rsplit(':', 1)
+        return socket_events(host, int(port))
+    return tail_file(spec)
@@ -69,7 +69,7 @@ def load_engine():
         generator.save_data()
     
     # Check if models exist
-    if not os.path.exists('models/knn_model.pkl'):
+    if not os.path.exists('models/manifest.json'):
         st.info("Training recommendation models... This will take a moment.")
         engine.train()
         engine.save_models()
@@ -1,7 +1,26 @@
 """
 Test script for recommendation system
 """
-from recommendation_engine import FlipkartRecommendationEngine
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import recommendation_engine
+from recommendation_engine import (
+    FlipkartRecommendationEngine, interaction_ratings, DATA_DTYPES, _popularity_rankings
+)
+from stream_ingest import StreamIngestor, clean_event, parse_timestamp, tail_file
+from async_service import _settle
+from cache import RecommendationCache
+from facets import FacetIndex, decode_cursor, encode_cursor, parse_filters
+from precompute import RecommendationStore, precompute
+from neighbors import LSHNeighbors
+from sklearn.neighbors import NearestNeighbors
+import numpy as np
 import pandas as pd
 
 def test_recommendations():
@@ -109,5 +128,557 @@ def test_recommendations():
     print("✅ All tests completed successfully!")
     print("="*60)
 
+def _pivot_reference(interactions_df):
+    """User-item ratings as the original pivot_table built them"""
+    ratings = interaction_ratings(interactions_df).astype({'user_id': str, 'product_id': str})
+    return ratings.pivot_table(
+        index='user_id',
+        columns='product_id',
+        values='final_rating',
+        fill_value=0
+    )
+
+def test_saved_models_round_trip():
+    """Loaded models recommend exactly what the trained engine did"""
+    trained = FlipkartRecommendationEngine()
+    trained.train(workers=1)
+    user_ids = list(trained.users_df['user_id'][::40]) + ['NOBODY']
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        model_dir = os.path.join(tmp, 'models')
+        trained.save_models(model_dir)
+        loaded = FlipkartRecommendationEngine()
+        loaded.load_models(model_dir)
+        
+        # Only the per-user index and product codes are loaded up front
+        assert 'interactions_df' not in loaded.__dict__
+        for method in ('knn', 'als', 'item'):
+            assert (loaded.get_collaborative_recommendations_batch(user_ids, 10, method)
+                    == trained.get_collaborative_recommendations_batch(user_ids, 10, method)), method
+        assert (loaded.get_hybrid_recommendations_batch(user_ids, 10)
+                == trained.get_hybrid_recommendations_batch(user_ids, 10))
+        assert 'interactions_df' not in loaded.__dict__
+        
+        # The interactions table is read on first use
+        history = loaded.get_user_interactions(user_ids[0])
+        assert 'interactions_df' in loaded.__dict__
+        assert history.equals(trained.get_user_interactions(user_ids[0]))
+        
+        # A different catalogue in data_dir is refused
+        data_dir = os.path.join(tmp, 'data')
+        shutil.copytree(trained.data_dir, data_dir)
+        products = pd.read_csv(os.path.join(data_dir, 'products.csv'))
+        products.iloc[:-1].to_csv(os.path.join(data_dir, 'products.csv'), index=False)
+        try:
+            FlipkartRecommendationEngine(data_dir=data_dir).load_models(model_dir)
+        except ValueError as e:
+            assert 'retrain' in str(e)
+        else:
+            raise AssertionError('loaded models trained on another catalogue')
+    
+    print("✅ Saved models round-trip")
+
+def test_collaborative_matches_pivot_reference():
+    """KNN recommendations match the original pivot-table implementation"""
+    engine = FlipkartRecommendationEngine()
+    engine.load_data()
+    engine.prepare_user_item_matrix()
+    engine.build_collaborative_filtering()
+    
+    pivot = _pivot_reference(engine.interactions_df)
+    assert list(pivot.index) == list(engine.matrix_user_ids)
+    assert list(pivot.columns) == list(engine.matrix_product_ids)
+    assert np.allclose(pivot.values, engine.user_item_matrix.toarray())
+    
+    knn = NearestNeighbors(metric='cosine', algorithm='brute', n_neighbors=20).fit(pivot.values)
+    for user_id in pivot.index[::25]:
+        user_idx = pivot.index.get_loc(user_id)
+        _, indices = knn.kneighbors(pivot.values[user_idx].reshape(1, -1), n_neighbors=11)
+        
+        # Average neighbour ratings of unseen products, stable sort by average
+        recommendations = {}
+        user_products = set(pivot.columns[pivot.iloc[user_idx] > 0])
+        for idx in indices.flatten()[1:]:
+            for product_id, rating in pivot.iloc[idx].items():
+                if rating > 0 and product_id not in user_products:
+                    recommendations.setdefault(product_id, []).append(rating)
+        expected = [
+            product for product, _ in sorted(
+                ((product, np.mean(ratings)) for product, ratings in recommendations.items()),
+                key=lambda x: x[1],
+                reverse=True
+            )[:10]
+        ]
+        assert engine.get_collaborative_recommendations(user_id, 10) == expected, user_id
+    
+    print("✅ Collaborative recommendations match the pivot-table reference")
+
+def _new_interactions(engine, seed, n=60):
+    """Random interactions, including new users, a new product and repeated timestamps"""
+    rng = np.random.default_rng(seed)
+    users = list(engine.users_df['user_id'][:50]) + [f'NEWUSER{seed}', 'NEWUSER']
+    products = list(engine.product_ids[:50]) + ['NEWPROD']
+    old_timestamps = engine.interactions_df['timestamp'].sample(n, random_state=seed).to_numpy()
+    return pd.DataFrame({
+        'user_id': rng.choice(users, n),
+        'product_id': rng.choice(products, n),
+        'interaction_type': rng.choice(['view', 'cart', 'purchase'], n),
+        'rating': np.where(rng.random(n) < 0.3, rng.integers(1, 6, n), np.nan),
+        'timestamp': np.where(
+            rng.random(n) < 0.5,
+            old_timestamps,
+            np.datetime64('2030-01-01') + rng.integers(0, 3, n).astype('timedelta64[s]')
+        )
+    })
+
+def _assert_matches_rebuild(engine, interactions_df):
+    """Ingested state equals a fresh build over the concatenated interactions"""
+    rebuilt = FlipkartRecommendationEngine()
+    rebuilt.interactions_df = interactions_df
+    rebuilt._build_user_interaction_index()
+    rebuilt.prepare_user_item_matrix()
+    
+    # Ingest appends new ids; compare cells by (user, product) id
+    rows = [engine.user_to_row[user_id] for user_id in rebuilt.matrix_user_ids]
+    cols = [engine.product_to_col[product_id] for product_id in rebuilt.matrix_product_ids]
+    assert engine.user_item_matrix.shape == rebuilt.user_item_matrix.shape
+    assert np.array_equal(
+        engine.user_item_matrix[rows][:, cols].toarray(),
+        rebuilt.user_item_matrix.toarray()
+    )
+    
+    for user_id in rebuilt.user_to_interactions:
+        expected = rebuilt.get_user_interactions(user_id).reset_index(drop=True)
+        actual = engine.get_user_interactions(user_id).reset_index(drop=True)
+        for column in ('user_id', 'product_id', 'interaction_type'):
+            assert actual[column].astype(str).tolist() == expected[column].astype(str).tolist(), user_id
+        assert np.array_equal(actual['rating'].to_numpy(), expected['rating'].to_numpy(), equal_nan=True)
+        assert np.array_equal(actual['timestamp'].to_numpy(), expected['timestamp'].to_numpy())
+
+def test_ingest_matches_full_rebuild():
+    """ingest() leaves the same matrix and histories as rebuilding from scratch"""
+    engine = FlipkartRecommendationEngine()
+    engine.load_data()
+    engine.prepare_user_item_matrix()
+    engine.build_collaborative_filtering()
+    batches = [engine.interactions_df]
+    
+    # Buffered in interaction_delta
+    for seed in (1, 2):
+        batches.append(_new_interactions(engine, seed))
+        engine.ingest(batches[-1])
+    assert len(engine.interaction_delta) == 120
+    _assert_matches_rebuild(
+        engine, pd.concat(batches, ignore_index=True).astype(DATA_DTYPES['interactions'])
+    )
+    
+    # Folded into interactions_df once the buffer passes the threshold
+    limits = (recommendation_engine.INTERACTION_DELTA_SHARE, recommendation_engine.INTERACTION_DELTA_MIN_ROWS)
+    recommendation_engine.INTERACTION_DELTA_SHARE, recommendation_engine.INTERACTION_DELTA_MIN_ROWS = 0, 150
+    try:
+        batches.append(_new_interactions(engine, 3))
+        engine.ingest(batches[-1])
+    finally:
+        recommendation_engine.INTERACTION_DELTA_SHARE, recommendation_engine.INTERACTION_DELTA_MIN_ROWS = limits
+    assert len(engine.interaction_delta) == 0
+    _assert_matches_rebuild(
+        engine, pd.concat(batches, ignore_index=True).astype(DATA_DTYPES['interactions'])
+    )
+    
+    print("✅ Ingested state matches a full rebuild")
+
+def test_rating_updates_match_full_ranking_rebuild():
+    """Re-ranking only the updated products gives the same orders as rebuilding them"""
+    engine = FlipkartRecommendationEngine()
+    engine.load_data()
+    version = engine.model_version
+    engine.update_product_ratings([])
+    assert engine.model_version == version
+    
+    rng = np.random.default_rng(0)
+    for _ in range(3):
+        rows = rng.choice(len(engine.product_ids), 25, replace=False)
+        engine.update_product_ratings([
+            {
+                'product_id': engine.product_ids[row],
+                # Copy existing values too, so ties with unchanged products occur
+                'rating': float(rng.choice(engine.products_df['rating'])),
+                'num_reviews': int(rng.choice(engine.products_df['num_reviews']))
+            }
+            for row in rows
+        ])
+        
+        popular_order, category_orders = _popularity_rankings(engine.products_df)
+        assert np.array_equal(engine.popular_order, popular_order)
+        assert engine.category_orders.keys() == category_orders.keys()
+        for category, order in category_orders.items():
+            assert np.array_equal(engine.category_orders[category], order), category
+    
+    print("✅ Rating updates match a full ranking rebuild")
+
+def _ingested_engine(backend, new_products):
+    """Engine with a fitted lsh/ivf index, after two ingests of purchases and carts"""
+    engine = FlipkartRecommendationEngine(neighbor_backend=backend)
+    engine.load_data()
+    engine.prepare_user_item_matrix()
+    engine.build_collaborative_filtering()
+    
+    rng = np.random.default_rng(7)
+    users = list(engine.matrix_user_ids[:40]) + ['NEWUSER1', 'NEWUSER2']
+    products = list(engine.matrix_product_ids[:40]) + (['NEWPROD'] if new_products else [])
+    for _ in range(2):
+        engine.ingest(pd.DataFrame({
+            'user_id': rng.choice(users, 50),
+            'product_id': rng.choice(products, 50),
+            'interaction_type': rng.choice(['cart', 'purchase'], 50),
+            'rating': np.nan,
+            'timestamp': np.datetime64('2030-01-01')
+        }))
+    return engine
+
+def test_neighbor_index_updates_match_refit():
+    """Incrementally updated lsh/ivf indexes equal an index rebuilt over the same data"""
+    # Without new product columns LSH keeps its planes, so it equals a full refit
+    engine = _ingested_engine('lsh', new_products=False)
+    updated, X = engine.knn_model, engine.user_item_matrix
+    refit = LSHNeighbors().fit(X)
+    assert np.array_equal(updated._order, refit._order)
+    assert np.array_equal(updated._codes, refit._codes)
+    queries = X[::20]
+    for a, b in zip(updated.kneighbors(queries, 11), refit.kneighbors(queries, 11)):
+        assert np.allclose(a, b)
+    
+    # With new columns the planes are extended; rows must be hashed as a build would
+    engine = _ingested_engine('lsh', new_products=True)
+    updated = engine.knn_model
+    assert updated._planes.shape[1] == engine.user_item_matrix.shape[1]
+    codes = updated._hash(updated._X)
+    order = np.argsort(codes, axis=1, kind='stable')
+    assert np.array_equal(updated._order, order)
+    assert np.array_equal(updated._codes, np.take_along_axis(codes, order, axis=1))
+    
+    # IVF keeps its centroids; every row must sit in the list a fresh assignment picks
+    for new_products in (False, True):
+        engine = _ingested_engine('ivf', new_products)
+        updated = engine.knn_model
+        assignment = np.asarray((updated._X @ updated._centroids.T).argmax(axis=1)).ravel()
+        assert np.array_equal(updated._list_order, np.argsort(assignment, kind='stable'))
+        assert np.array_equal(updated._list_offsets, np.concatenate(
+            ([0], np.cumsum(np.bincount(assignment, minlength=len(updated._centroids))))
+        ))
+    
+    print("✅ Neighbour index updates match a rebuild")
+
+def test_item_recommendations_backfill_from_popular():
+    """Item-based lists are always full and never repeat what the user rated"""
+    engine = FlipkartRecommendationEngine()
+    engine.load_data()
+    engine.prepare_user_item_matrix()
+    engine.build_collaborative_filtering()
+    engine.build_item_similarity()
+    
+    for user_id in engine.matrix_user_ids[::50]:
+        row = engine.user_to_row[user_id]
+        rated = set(engine.matrix_product_ids[engine.user_item_matrix[row].indices])
+        recommendations = engine.get_collaborative_recommendations(user_id, 10, 'item')
+        assert len(recommendations) == len(set(recommendations)) == 10, user_id
+        assert not rated & set(recommendations), user_id
+    
+    # Unknown users, and new users whose only product has no neighbour list yet
+    engine.ingest([{
+        'user_id': 'NEWUSER', 'product_id': 'NEWPROD', 'interaction_type': 'purchase',
+        'rating': None, 'timestamp': '2030-01-01'
+    }])
+    popular = engine.get_popular_products(10)
+    assert engine.get_collaborative_recommendations('NEWUSER', 10, 'item') == popular
+    assert engine.get_collaborative_recommendations('NOBODY', 10, 'item') == popular
+    
+    print("✅ Item-based recommendations are backfilled from popular products")
+
+def test_stream_epoch_timestamps():
+    """Epoch seconds parse the same from a tailed CSV line and from JSON"""
+    expected = pd.Timestamp('2025-01-01 00:00:00')
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'stream.csv')
+        with open(path, 'w') as f:
+            f.write('user_id,product_id,interaction_type,rating,timestamp\n')
+            f.write('USER0001,PROD0001,view,,1735689600\n')
+        
+        stop = threading.Event()
+        for raw in tail_file(path, poll_interval=0.01, from_start=True, stop_event=stop):
+            if raw is not None:
+                stop.set()
+                csv_event = clean_event(raw)
+    
+    json_event = clean_event(json.loads(
+        '{"user_id": "USER0001", "product_id": "PROD0001", '
+        '"interaction_type": "view", "rating": null, "timestamp": 1735689600}'
+    ))
+    assert csv_event['timestamp'] == json_event['timestamp'] == expected
+    
+    # Short digit runs are still dates; fractional epoch text matches the float
+    assert parse_timestamp('20250101') == expected
+    assert parse_timestamp('1735689600.5') == parse_timestamp(1735689600.5) == (
+        expected + pd.Timedelta(milliseconds=500)
+    )
+    
+    print("✅ Epoch timestamps parse from CSV and JSON events")
+
+def test_facet_masks_match_dataframe_filters():
+    """Bitmap filters select the same rows as the equivalent DataFrame mask"""
+    engine = FlipkartRecommendationEngine()
+    engine.load_catalogue()
+    products = engine.products_df
+    index = FacetIndex(products)
+    categories = products['category'].astype(str).unique().tolist()
+    brands = products['brand'].astype(str).unique().tolist()
+    prices = products['price'].quantile([0.1, 0.5, 0.9]).tolist() + [products['price'].iloc[0]]
+    
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        params = {}
+        if rng.random() < 0.6:
+            params['category'] = rng.choice(categories, rng.integers(1, 3)).tolist() + ['NoSuchCategory']
+        if rng.random() < 0.3:
+            params['brand'] = rng.choice(brands, rng.integers(1, 3)).tolist()
+        if rng.random() < 0.5:
+            params['min_price'] = str(rng.choice(prices))
+        if rng.random() < 0.5:
+            params['max_price'] = str(rng.choice(prices))
+        if rng.random() < 0.5:
+            params['min_rating'] = str(rng.choice([3.5, 4.0, 4.5, products['rating'].iloc[1]]))
+        if rng.random() < 0.3:
+            params['min_discount'] = str(rng.choice([10, 25, 40]))
+        if rng.random() < 0.3:
+            params['in_stock'] = 'true'
+        
+        expected = np.ones(len(products), dtype=bool)
+        if 'category' in params:
+            expected &= products['category'].astype(str).isin(params['category']).to_numpy()
+        if 'brand' in params:
+            expected &= products['brand'].astype(str).isin(params['brand']).to_numpy()
+        if 'min_price' in params:
+            expected &= (products['price'] >= float(params['min_price'])).to_numpy()
+        if 'max_price' in params:
+            expected &= (products['price'] <= float(params['max_price'])).to_numpy()
+        if 'min_rating' in params:
+            expected &= (products['rating'] >= float(params['min_rating'])).to_numpy()
+        if 'min_discount' in params:
+            expected &= (products['discount'] >= float(params['min_discount'])).to_numpy()
+        if 'in_stock' in params:
+            expected &= (products['stock'] > 0).to_numpy()
+        
+        mask = index.mask(parse_filters(params))
+        actual = np.ones(len(products), dtype=bool) if mask is None else mask
+        assert np.array_equal(actual, expected), params
+    
+    print("✅ Facet bitmaps match DataFrame filters")
+
+def test_cursor_pagination():
+    """Cursors round-trip, and next_cursor appears only while another page exists"""
+    import app as app_module
+    
+    for position in (0, 1, 10, 12345):
+        assert decode_cursor(encode_cursor(position)) == position
+    for cursor in ('not-a-cursor', encode_cursor(-1)):
+        try:
+            decode_cursor(cursor)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(cursor)
+    
+    # The caller asks for one item past the page
+    ranked = list(range(20))
+    assert app_module.paginate(ranked, 0, 10) == (ranked[:10], encode_cursor(10))
+    assert app_module.paginate(ranked[:20], 10, 10) == (ranked[10:20], None)
+    assert app_module.paginate(ranked[:15], 10, 10) == (ranked[10:15], None)
+    
+    # Walking /api/recommend/popular page by page yields the full ranking once
+    app_module.engine.load_catalogue()
+    client = app_module.app.test_client()
+    pages, cursor = [], ''
+    while True:
+        response = client.get(f'/api/recommend/popular?n=7&cursor={cursor}').get_json()
+        pages.append([product['product_id'] for product in response['recommendations']])
+        cursor = response['next_cursor']
+        if cursor is None:
+            break
+    assert all(len(page) == 7 for page in pages[:-1]) and pages[-1]
+    assert sum(pages, []) == app_module.engine.get_popular_products(len(app_module.engine.product_ids))
+    
+    print("✅ Cursor pagination round-trips")
+
+def test_cache_invalidates_on_model_version():
+    """Cached responses are reused until the model version changes"""
+    cache = RecommendationCache(ttl=60)
+    calls = []
+    compute = lambda: calls.append(1) or ['PROD0001']
+    
+    for version in (1, 1, 2, 2):
+        assert cache.get_or_compute(('get_popular_products', 10), compute, version=version) == ['PROD0001']
+    assert len(calls) == 2
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['invalidations']) == (2, 2, 1)
+    
+    print("✅ Cache is invalidated on model_version changes")
+
+def test_settle_keeps_results_aligned():
+    """Batch results go to their own callers even when one caller already gave up"""
+    loop = asyncio.new_event_loop()
+    try:
+        futures = [loop.create_future() for _ in range(3)]
+        futures[1].cancel()
+        done = loop.create_future()
+        done.set_result([['A'], ['B'], ['C']])
+        _settle(done, futures, batched=True)
+        assert futures[0].result() == ['A'] and futures[2].result() == ['C']
+        
+        futures = [loop.create_future() for _ in range(2)]
+        done = loop.create_future()
+        done.set_exception(KeyError('USER0001'))
+        _settle(done, futures, batched=True)
+        assert all(isinstance(future.exception(), KeyError) for future in futures)
+    finally:
+        loop.close()
+    
+    print("✅ _settle keeps batch results aligned with callers")
+
+class _RecordingEngine:
+    """Stands in for the engine, keeping every ingested batch"""
+    
+    def __init__(self):
+        self.batches = []
+    
+    def ingest(self, batch_df):
+        self.batches.append(batch_df)
+
+class _FailingEngine:
+    """Stands in for an engine whose ingest() always fails"""
+    
+    def ingest(self, batch_df):
+        raise ValueError('catalogue is locked')
+
+def test_stream_records_ingest_errors():
+    """A failing ingest() is counted and its cause kept in the metrics"""
+    event = {'user_id': 'USER0001', 'product_id': 'PROD0001', 'interaction_type': 'view',
+             'rating': '', 'timestamp': '2025-01-01 10:00:00'}
+    ingestor = StreamIngestor(_FailingEngine(), (e for e in [event]), max_batch_wait=0.05)
+    ingestor.start()
+    deadline = time.monotonic() + 5
+    while ingestor.metrics()['errors'] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    ingestor.stop()
+    
+    metrics = ingestor.metrics()
+    assert (metrics['errors'], metrics['ingested']) == (1, 0)
+    assert metrics['last_error'] == 'ValueError: catalogue is locked'
+    
+    print("✅ Stream ingest errors are recorded")
+
+def test_stream_counts_invalid_events():
+    """Malformed events are counted as invalid and never reach the engine"""
+    valid = {'user_id': 'USER0001', 'product_id': 'PROD0001', 'interaction_type': 'view',
+             'rating': '', 'timestamp': '2025-01-01 10:00:00'}
+    events = [
+        valid,
+        dict(valid, product_id='PROD0002', interaction_type='purchase', rating='4'),
+        dict(valid),                               # duplicate
+        b'{not json',                              # undecodable socket line
+        {'user_id': 'USER0001'},                   # missing fields
+        dict(valid, interaction_type='click'),     # unknown type
+        dict(valid, timestamp='yesterday-ish'),    # bad timestamp
+        dict(valid, rating='five')                 # bad rating
+    ]
+    
+    engine = _RecordingEngine()
+    ingestor = StreamIngestor(engine, (event for event in events), max_batch_wait=0.05)
+    ingestor.start()
+    deadline = time.monotonic() + 5
+    while ingestor.metrics()['received'] < len(events) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    ingestor.stop()
+    
+    metrics = ingestor.metrics()
+    assert (metrics['received'], metrics['invalid'], metrics['duplicates']) == (8, 5, 1)
+    assert metrics['ingested'] == sum(len(batch) for batch in engine.batches) == 2
+    assert metrics['rated'] == 1
+    
+    print("✅ Invalid stream events are counted and dropped")
+
+def test_serving_probes_and_startup():
+    """/readyz is 503 until initialize_app() has loaded the saved models, which it never retrains"""
+    import app as app_module
+    
+    engine, ready = app_module.engine, app_module.ready
+    app_module.engine = FlipkartRecommendationEngine()
+    app_module.ready = threading.Event()
+    def train(*args, **kwargs):
+        raise AssertionError('initialize_app() must not train')
+    app_module.engine.train = train
+    client = app_module.app.test_client()
+    try:
+        assert client.get('/healthz').status_code == 200
+        response = client.get('/readyz')
+        assert response.status_code == 503 and response.get_json()['status'] == 'loading'
+        
+        # Without saved models the server fails to start instead of training
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                app_module.initialize_app()
+            except FileNotFoundError:
+                pass
+            else:
+                raise AssertionError('started without saved models')
+            finally:
+                os.chdir(cwd)
+        assert client.get('/readyz').status_code == 503
+        
+        app_module.initialize_app()
+        response = client.get('/readyz')
+        assert response.status_code == 200
+        assert response.get_json() == {'status': 'ready', 'model_version': 1}
+        assert client.get('/healthz').status_code == 200
+    finally:
+        app_module.engine, app_module.ready = engine, ready
+    
+    print("✅ Serving probes follow model loading")
+
+def test_precompute_rerun_leaves_open_store_intact():
+    """A rerun writes a new array set; a store opened earlier keeps serving its own"""
+    with tempfile.TemporaryDirectory() as tmp:
+        precompute(tmp, n_recommendations=5, methods=('hybrid',), workers=2)
+        store = RecommendationStore(tmp)
+        user_ids = store.user_ids[:20].tolist()
+        before = [store.get(user_id, 'hybrid', 5) for user_id in user_ids]
+        
+        precompute(tmp, n_recommendations=3, methods=('hybrid',), workers=2)
+        assert [store.get(user_id, 'hybrid', 5) for user_id in user_ids] == before
+        
+        reopened = RecommendationStore(tmp)
+        assert reopened.manifest['arrays_dir'] != store.manifest['arrays_dir']
+        assert [reopened.get(user_id, 'hybrid', 5) for user_id in user_ids] == [
+            recommendations[:3] for recommendations in before
+        ]
+    
+    print("✅ Precompute reruns never touch a mapped store")
+
 if __name__ == "__main__":
+    test_saved_models_round_trip()
+    test_collaborative_matches_pivot_reference()
+    test_ingest_matches_full_rebuild()
+    test_rating_updates_match_full_ranking_rebuild()
+    test_neighbor_index_updates_match_refit()
+    test_item_recommendations_backfill_from_popular()
+    test_stream_epoch_timestamps()
+    test_facet_masks_match_dataframe_filters()
+    test_cursor_pagination()
+    test_cache_invalidates_on_model_version()
+    test_settle_keeps_results_aligned()
+    test_stream_counts_invalid_events()
+    test_stream_records_ingest_errors()
+    test_serving_probes_and_startup()
+    test_precompute_rerun_leaves_open_store_intact()
     test_recommendations()
\ No newline at end of file
@@ -0,0 +1,18 @@
+"""
+Production WSGI entry point.
+
+Models are loaded once at import. With gunicorn's preload_app this
+happens in the master process before it forks, so every worker shares
+the memory-mapped model arrays copy-on-write:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+import gc
+
+from app import app, initialize_app
+
+initialize_app()
+
+# Move everything loaded so far out of the collector's reach, so the
+# workers' GC passes don't write to (and un-share) those pages
+gc.freeze()